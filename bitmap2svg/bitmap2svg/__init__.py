@@ -3,4 +3,15 @@
 This package provides a Potrace-hybrid logo to SVG pipeline.
 It includes modules for image ingestion, segmentation, vectorization,
 SVG output, and quality assurance.
-"""
\ No newline at end of file
+"""
+
+from importlib.metadata import PackageNotFoundError, version
+
+try:
+    __version__ = version("bitmap2svg")
+except PackageNotFoundError:  # pragma: no cover - running from a source tree
+    __version__ = "0.0.0"
+
+# Version of the SVG output for unchanged settings. Bump it with every change
+# that alters the output so manifests and result stores stop serving old SVGs.
+PIPELINE_VERSION = 1
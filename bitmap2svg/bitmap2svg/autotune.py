@@ -0,0 +1,120 @@
+"""Per-image search for the smallest SVG that still passes QA.
+
+The tuner walks ladders of ``k_colors``, ``rdp_epsilon`` and
+``bezier.max_err_px`` (upstream parameters first), moving towards smaller
+output while ``qa.evaluate`` stays above ``QACfg.ssim_thresh`` and
+``QACfg.edge_iou_thresh``. Each ladder stops at its first failure or when the
+output stops shrinking, and the total number of evaluations is capped. Later
+candidates only change downstream parameters, so the pipeline's stage caches
+reuse the segmentation, tracing and simplification of earlier ones.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .config import Settings
+from .ingest import LoadedImage
+from .pipeline import vectorise
+
+RDP_LADDER = (0.5, 0.8, 1.2, 1.6, 2.0, 2.5, 3.0)
+BEZIER_LADDER = (0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0)
+K_MIN, K_MAX = 2, 12
+
+
+@dataclass
+class Trial:
+    settings: Settings
+    metrics: Dict[str, Any]
+    passed: bool
+
+
+@dataclass
+class TuneResult:
+    settings: Settings
+    result: Any
+    passed: bool
+    trials: List[Trial] = field(default_factory=list)
+
+    def report(self) -> Dict[str, Any]:
+        """Chosen parameters and outcome in a JSON-friendly form."""
+        return {
+            "passed": self.passed,
+            "evaluations": len(self.trials),
+            "k_colors": self.settings.k_colors,
+            "rdp_epsilon": self.settings.rdp_epsilon,
+            "max_err_px": self.settings.bezier.max_err_px,
+            "metrics": self.result.metrics,
+        }
+
+
+def _with(cfg: Settings, param: str, value) -> Settings:
+    if param == "max_err_px":
+        return cfg.model_copy(update={"bezier": cfg.bezier.model_copy(update={param: value})})
+    return cfg.model_copy(update={param: value})
+
+
+def _get(cfg: Settings, param: str):
+    return cfg.bezier.max_err_px if param == "max_err_px" else getattr(cfg, param)
+
+
+def _passes(metrics: Dict[str, Any], cfg: Settings) -> bool:
+    return (metrics["ssim"] >= cfg.qa.ssim_thresh
+            and metrics["edge_iou"] >= cfg.qa.edge_iou_thresh)
+
+
+def _margin(metrics: Dict[str, Any], cfg: Settings) -> float:
+    return min(metrics["ssim"] - cfg.qa.ssim_thresh, metrics["edge_iou"] - cfg.qa.edge_iou_thresh)
+
+
+def _ladders(cfg: Settings) -> List[Tuple[str, Sequence]]:
+    """(parameter, values ordered from most faithful to smallest output)."""
+    ks = sorted({*range(K_MIN, K_MAX + 1), cfg.k_colors}, reverse=True)
+    rdp = sorted({*RDP_LADDER, cfg.rdp_epsilon})
+    bez = sorted({*BEZIER_LADDER, cfg.bezier.max_err_px})
+    return [("k_colors", ks), ("rdp_epsilon", rdp), ("max_err_px", bez)]
+
+
+def autotune(img: LoadedImage, cfg: Settings, budget: int = 16) -> TuneResult:
+    """Find settings that minimise SVG bytes subject to the QA thresholds.
+
+    Starts from ``cfg`` and evaluates at most ``budget`` candidates. When no
+    candidate passes, the one closest to the thresholds is returned with
+    ``passed`` set to False.
+    """
+    trials: List[Trial] = []
+    seen: Dict[str, Tuple[Any, Trial]] = {}
+
+    def evaluate(candidate: Settings):
+        key = candidate.model_dump_json()
+        if key not in seen:
+            res = vectorise(img, candidate)
+            metrics = res.run_qa()  # tuning needs QA whatever ``qa.mode`` says
+            trial = Trial(candidate, metrics, _passes(metrics, candidate))
+            trials.append(trial)
+            seen[key] = (res, trial)
+        return seen[key]
+
+    best_res, best = evaluate(cfg)
+    for param, ladder in _ladders(cfg):
+        start = ladder.index(_get(best.settings, param))
+        if not best.passed:
+            # Walk towards fidelity until QA passes.
+            steps = ladder[:start][::-1]
+        else:
+            steps = ladder[start + 1:]
+        for value in steps:
+            if len(trials) >= budget:
+                break
+            res, trial = evaluate(_with(best.settings, param, value))
+            if not best.passed:
+                if trial.passed or _margin(trial.metrics, cfg) > _margin(best.metrics, cfg):
+                    best_res, best = res, trial
+                if trial.passed:
+                    break
+                continue
+            if not trial.passed or trial.metrics["bytes"] >= best.metrics["bytes"]:
+                break  # early stop: QA failed or the output stopped shrinking
+            best_res, best = res, trial
+    return TuneResult(settings=best.settings, result=best_res, passed=best.passed, trials=trials)
@@ -0,0 +1,131 @@
+"""Micro-benchmarks for the hot geometry stages.
+
+Each benchmark times the current implementation against a straightforward
+per-point reference, passed in by the caller, so speedups can be tracked as the
+engines change. The references live with the parity tests in
+``tests/_reference.py``; running that file (``make bench``) calls :func:`main`.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, Iterable, List, Tuple
+
+import numpy as np
+
+from . import bezier
+from .geometry import Contours
+from .simplify import rdp_all
+from .vector_critic import SnapCfg, snap
+
+SIZES = (100, 1_000, 10_000)
+
+
+def noisy_circle(n: int, r: float = 200.0, noise: float = 0.6, seed: int = 0) -> np.ndarray:
+    """Closed ``n``-point contour around a circle with deterministic jitter."""
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0.0, 2*np.pi, n, endpoint=False)
+    P = np.stack([r + r*np.cos(t), r + r*np.sin(t)], axis=1)
+    P += rng.normal(scale=noise, size=P.shape)
+    return np.vstack([P, P[:1]])
+
+
+def _timeit(fn: Callable[[], object], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def glyph_contours(n: int, seed: int = 0) -> List[np.ndarray]:
+    """``n`` small closed contours: a mix of boxes, rounds and jagged glyphs."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for k in range(n):
+        ox, oy = rng.uniform(0, 2000, 2)
+        s = rng.uniform(4, 20)
+        kind = k % 3
+        if kind == 0:
+            P = np.array([(0, 0), (s, 0), (s, s*0.7), (0, s*0.7)])
+        elif kind == 1:
+            t = np.linspace(0, 2*np.pi, 24, endpoint=False)
+            P = np.stack([s*np.cos(t), s*np.sin(t)], axis=1)
+        else:
+            t = np.linspace(0, 2*np.pi, 16, endpoint=False)
+            P = np.stack([s*np.cos(t), s*np.sin(t)], axis=1) * rng.uniform(0.3, 1.0, (16, 1))
+        P = P + (ox, oy)
+        out.append(np.vstack([P, P[:1]]))
+    return out
+
+
+def bench_snap(ref_snap: Callable, sizes: Iterable[int] = SIZES):
+    """Time snapping ``n`` glyph-sized contours against ``ref_snap(rings)``.
+
+    Returns ``(n_contours, reference_seconds, batched_seconds)`` rows.
+    """
+    rows = []
+    for n in sizes:
+        rings = glyph_contours(n)
+        packed = Contours.pack(rings)
+        rows.append((n, _timeit(lambda: ref_snap(rings), repeat=1),
+                     _timeit(lambda: snap(packed, SnapCfg()))))
+    return rows
+
+
+def bench_rdp(ref_rdp: Callable, sizes: Iterable[int] = SIZES, contours: int = 4,
+              epsilon: float = 1.2):
+    """Time simplifying ``contours`` noisy rings per size against ``ref_rdp(ring, epsilon)``.
+
+    Returns ``(n_points, reference_seconds, batched_seconds)`` rows.
+    """
+    rows = []
+    for n in sizes:
+        rings = [noisy_circle(n, noise=1.0, seed=k) for k in range(contours)]
+        packed = Contours.pack(rings)
+        rows.append((n, _timeit(lambda: [ref_rdp(r, epsilon) for r in rings], repeat=1),
+                     _timeit(lambda: rdp_all(packed, epsilon))))
+    return rows
+
+
+def bench_bezier(ref_generate: Callable, ref_max_error: Callable, ref_reparameterize: Callable,
+                 sizes: Iterable[int] = SIZES) -> List[Tuple[int, float, float]]:
+    """Time one fit round (generate, error scan, reparameterize) per size.
+
+    The references take the arguments of the ``bezier`` helpers they stand for.
+
+    Returns ``(n_points, reference_seconds, vectorised_seconds)`` rows.
+    """
+    rows = []
+    for n in sizes:
+        P = bezier._prepare_points(noisy_circle(n), closed=True)
+        U = bezier._chord_params(P)
+        lt = bezier._unit(P[1] - P[0]); rt = -bezier._unit(P[-2] - P[-1])
+
+        def ref():
+            C = ref_generate(P, U, lt, rt)
+            ref_max_error(P, C, U)
+            ref_reparameterize(P, C, U)
+
+        def vec():
+            C = bezier._generate_bezier(P, U, lt, rt)
+            bezier._find_max_error(P, C, U)
+            bezier._reparameterize(P, C, U)
+
+        rows.append((n, _timeit(ref), _timeit(vec)))
+    return rows
+
+
+def _report(title: str, rows: List[Tuple[int, float, float]], unit: str = "points") -> None:
+    print(title)
+    print(f"{unit:>8} {'reference ms':>13} {'current ms':>11} {'speedup':>8}")
+    for n, ref, cur in rows:
+        print(f"{n:>8} {ref*1e3:>13.2f} {cur*1e3:>11.3f} {ref/cur:>7.1f}x")
+
+
+def main(ref_generate: Callable, ref_max_error: Callable, ref_reparameterize: Callable,
+         ref_rdp: Callable, ref_snap: Callable) -> None:
+    _report("bezier fit round", bench_bezier(ref_generate, ref_max_error, ref_reparameterize))
+    _report("rdp, 4 contours", bench_rdp(ref_rdp))
+    _report("snap", bench_snap(ref_snap), unit="contours")
@@ -1,13 +1,19 @@
 from __future__ import annotations
-from typing import List, Tuple
+from typing import List, Sequence, Tuple
 import numpy as np
 
+from .geometry import BezierPath, Contours
+
 Point = Tuple[float, float]
 CurveSeg = Tuple[Point, Point, Point, Point]
 
+# Schneider's iteration error: reparameterize only within 4x the tolerance.
+_ITERATION_ERR = 4.0
+
 class BezierCfg:
     max_err_px: float = 1.5
     max_segments: int = 256
+    corner_angle_deg: float = 70.0
 
 def fit(polylines: List[List[Point]], cfg: BezierCfg) -> List[Tuple[str, List[CurveSeg]]]:
     out: List[Tuple[str, List[CurveSeg]]] = []
@@ -19,69 +25,299 @@ def fit(polylines: List[List[Point]], cfg: BezierCfg) -> List[Tuple[str, List[Cu
 
         closed = _is_closed(pts)
         P = _prepare_points(pts, closed)
+        out.append(("bezier", _fit_contour(P, cfg)))
+    return out
 
-        left_tan  = _unit(_vsub(P[1], P[0]))
-        right_tan = _unit(_vsub(P[-2], P[-1])) * -1.0
+def _fit_contour(P: np.ndarray, cfg: BezierCfg) -> List[CurveSeg]:
+    """Fit one prepared contour using an explicit work stack.
 
-        segments: List[CurveSeg] = []
-        _fit_subcurve(P, left_tan, right_tan, cfg.max_err_px, cfg.max_segments, segments)
-        out.append(("bezier", segments))
+    The contour is first cut at its corners; every span is then fitted and
+    split at its worst point until it is within tolerance or the contour has
+    used up ``cfg.max_segments``.
+    """
+    err2 = cfg.max_err_px**2
+    cap = max(1, cfg.max_segments)
+    bounds = _corner_bounds(P, cfg.corner_angle_deg, cap)
+    stack = [(a, b, _unit(P[a+1] - P[a]), _unit(P[b-1] - P[b]))
+             for a, b in zip(bounds[-2::-1], bounds[:0:-1])]
+    out: List[CurveSeg] = []
+    while stack:
+        a, b, left_tan, right_tan = stack.pop()
+        C, split_i, ok = _fit_span(P[a:b+1], left_tan, right_tan, err2)
+        if ok or len(out) + len(stack) + 2 > cap:
+            out.append(C)
+            continue
+        center = a + split_i
+        tan_l = _unit(P[center+1] - P[center-1])
+        stack.append((center, b, -tan_l, right_tan))
+        stack.append((a, center, left_tan, tan_l))
     return out
 
-def _fit_subcurve(P: np.ndarray, left_tan: np.ndarray, right_tan: np.ndarray,
-                  err: float, seg_budget: int, out: List[CurveSeg]):
-    if seg_budget <= 0:
-        c = _generate_bezier(P, _chord_params(P), left_tan, right_tan)
-        out.append(c)
-        return
-
+def _fit_span(P: np.ndarray, left_tan: np.ndarray, right_tan: np.ndarray, err2: float):
+    """Fit one span, returning ``(curve, split_index, within_tolerance)``."""
     U = _chord_params(P)
     C = _generate_bezier(P, U, left_tan, right_tan)
-
     split_i, max_err = _find_max_error(P, C, U)
-    if max_err <= err**2:
-        out.append(C)
-        return
-
-    ok = False
+    # Reparameterization only pays off when the fit is already close;
+    # far-off spans go straight to splitting.
     for _ in range(3):
+        if max_err <= err2 or max_err > _ITERATION_ERR * err2:
+            break
         U = _reparameterize(P, C, U)
         C = _generate_bezier(P, U, left_tan, right_tan)
         split_i, max_err = _find_max_error(P, C, U)
-        if max_err <= err**2:
-            ok = True
-            break
-    if ok:
-        out.append(C)
-        return
+    return C, split_i, max_err <= err2
+
+def _corner_bounds(P: np.ndarray, angle_deg: float, cap: int) -> List[int]:
+    """Span boundaries of ``P``: both ends plus every corner vertex.
+
+    A corner is an interior vertex whose turning angle is at least
+    ``angle_deg``. At most ``cap - 1`` of the sharpest corners are kept.
+    """
+    n = len(P)
+    if n < 3 or angle_deg <= 0 or cap < 2:
+        return [0, n - 1]
+    v1 = P[1:-1] - P[:-2]; v2 = P[2:] - P[1:-1]
+    n1 = np.linalg.norm(v1, axis=1); n2 = np.linalg.norm(v2, axis=1)
+    valid = (n1 > 1e-12) & (n2 > 1e-12)
+    cos = np.einsum("ij,ij->i", v1, v2) / np.where(valid, n1*n2, 1.0)
+    turn = np.where(valid, np.arccos(np.clip(cos, -1.0, 1.0)), 0.0)
+    idx = np.flatnonzero(turn >= np.radians(angle_deg))
+    if len(idx) > cap - 1:
+        idx = np.sort(idx[np.argsort(-turn[idx], kind="stable")[:cap - 1]])
+    return [0, *(idx + 1).tolist(), n - 1]
 
-    center = split_i
-    tan_l = _unit(_vsub(P[center+1], P[center-1]))
-    tan_r = -tan_l
+def pack(polylines: Sequence[Sequence[Point]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack polylines into one ``(N, 2)`` array plus CSR-style ``offsets``.
+
+    Contour ``i`` is ``coords[offsets[i]:offsets[i+1]]``.
+    """
+    packed = Contours.pack(polylines)
+    return packed.coords, packed.offsets
+
+def fit_layers(layers: Sequence[Contours | List[List[Point]]], cfg: BezierCfg) -> List[List[BezierPath]]:
+    """Fit the contours of every layer in one batched pass.
+
+    Produces the same curves as ``[fit(polys, cfg) for polys in layers]``, as
+    :class:`BezierPath` records.
+    """
+    layers = [Contours.pack(polys) for polys in layers]
+    flat = Contours.concat(layers)
+    fitted = fit_packed(flat.coords, flat.offsets, cfg)
+    out, k = [], 0
+    for polys in layers:
+        out.append([BezierPath(ctrl) for ctrl in fitted[k:k+len(polys)]])
+        k += len(polys)
+    return out
+
+def fit_packed(coords: np.ndarray, offsets: np.ndarray, cfg: BezierCfg) -> List[np.ndarray]:
+    """Fit every contour of a packed ``(coords, offsets)`` layout at once.
+
+    All pending spans advance together: each round generates a curve for every
+    span, retires the ones within tolerance, reparameterizes the near misses
+    and re-queues the splits of those that still fail. Produces the same
+    segments as :func:`fit`, except that when ``max_segments`` binds the spans
+    are split breadth-first rather than depth-first. Contour ``i`` gets an
+    ``(n_i, 4, 2)`` array of control points.
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    n_contours = len(offsets) - 1
+    out: List = [[] for _ in range(n_contours)]
+    cap = max(1, cfg.max_segments)
+
+    prepared, st, en, cid = [], [], [], []
+    base = 0
+    for i in range(n_contours):
+        pts = coords[offsets[i]:offsets[i+1]]
+        if len(pts) == 0:
+            continue
+        if len(pts) < 3:
+            out[i] = pts[[0, 0, -1, -1]][None]
+            continue
+        P = _prepare_points(pts, _is_closed(pts))
+        bounds = _corner_bounds(P, cfg.corner_angle_deg, cap)
+        prepared.append(P)
+        st.extend(base + b for b in bounds[:-1])
+        en.extend(base + b for b in bounds[1:])
+        cid.extend([i] * (len(bounds) - 1))
+        base += len(P)
+    if not prepared:
+        return [np.asarray(o, dtype=np.float64).reshape(-1, 4, 2) for o in out]
 
-    _fit_subcurve(P[:center+1], left_tan, tan_l, err, seg_budget-1, out)
-    _fit_subcurve(P[center:], tan_r, right_tan, err, seg_budget-1, out)
+    P = np.concatenate(prepared)
+    s, e, c = np.asarray(st), np.asarray(en), np.asarray(cid)
+    spans = (s, e, _units(P[s+1] - P[s]), _units(P[e-1] - P[e]), c)
+    count = np.bincount(c, minlength=n_contours)
+    err2 = cfg.max_err_px**2
+    done: List[Tuple[int, int, np.ndarray]] = []
+
+    while len(spans[0]):
+        s, e, tl, tr, c = spans
+        R = _Ragged(s, e)
+        U = R.chord_params(P)
+        C = R.generate_bezier(P, U, tl, tr)
+        split_i, max_err = R.find_max_error(P, C, U)
+
+        ok = max_err <= err2
+        for _ in range(3):
+            retry = np.flatnonzero(~ok & (max_err <= _ITERATION_ERR * err2))
+            if not len(retry):
+                break
+            sub = R.select(retry)
+            Us = sub.reparameterize(P, C[retry], U[R.points_of(retry)])
+            Cs = sub.generate_bezier(P, Us, tl[retry], tr[retry])
+            si, me = sub.find_max_error(P, Cs, Us)
+            U[R.points_of(retry)] = Us
+            C[retry] = Cs; split_i[retry] = si; max_err[retry] = me
+            ok[retry] = me <= err2
+
+        # Spans that still fail are split while their contour has budget left,
+        # earliest spans first.
+        bad = np.flatnonzero(~ok)
+        bad = bad[np.lexsort((s[bad], c[bad]))]
+        cb = c[bad]
+        rank = np.arange(len(bad)) - np.searchsorted(cb, cb)
+        split = count[cb] + rank + 1 <= cap
+        np.add.at(count, cb[split], 1)
+        ok[bad[~split]] = True
+        bad = bad[split]
+
+        for j in np.flatnonzero(ok):
+            done.append((int(s[j]), int(c[j]), C[j]))
+
+        center = s[bad] + split_i[bad]
+        tan = _units(P[center + 1] - P[center - 1])
+        spans = (np.concatenate([s[bad], center]),
+                 np.concatenate([center, e[bad]]),
+                 np.concatenate([tl[bad], -tan]),
+                 np.concatenate([tan, tr[bad]]),
+                 np.tile(c[bad], 2))
+
+    done.sort(key=lambda d: d[0])
+    for _start, i, ctrl in done:
+        out[i].append(ctrl)
+    return [np.asarray(o, dtype=np.float64).reshape(-1, 4, 2) for o in out]
+
+class _Ragged:
+    """Index bookkeeping for a batch of ``[start, end]`` spans of one array."""
+
+    def __init__(self, start: np.ndarray, end: np.ndarray):
+        self.start, self.end = start, end
+        self.lens = end - start + 1
+        self.first = np.zeros(len(start), dtype=np.int64)
+        np.cumsum(self.lens[:-1], out=self.first[1:])
+        self.last = self.first + self.lens - 1
+        self.seg = np.repeat(np.arange(len(start)), self.lens)
+        self.idx = np.arange(int(self.lens.sum())) - np.repeat(self.first - start, self.lens)
+
+    def select(self, which: np.ndarray) -> "_Ragged":
+        return _Ragged(self.start[which], self.end[which])
+
+    def points_of(self, which: np.ndarray) -> np.ndarray:
+        lens = self.lens[which]
+        return np.arange(int(lens.sum())) - np.repeat(np.cumsum(lens) - lens - self.first[which], lens)
+
+    def sum(self, v: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(v, self.first, axis=0)
+
+    def chord_params(self, P: np.ndarray) -> np.ndarray:
+        Q = P[self.idx]
+        d = np.zeros(len(Q))
+        d[1:] = np.linalg.norm(Q[1:] - Q[:-1], axis=1)
+        d[self.first] = 0.0
+        cum = np.cumsum(d)
+        cum -= np.repeat(cum[self.first], self.lens)
+        total = cum[self.last]
+        flat = total <= 1e-12
+        U = cum / np.repeat(np.where(flat, 1.0, total), self.lens)
+        if flat.any():
+            local = np.arange(len(Q)) - np.repeat(self.first, self.lens)
+            lin = local / np.repeat(self.lens - 1, self.lens)
+            fp = flat[self.seg]
+            U[fp] = lin[fp]
+        return U
+
+    def generate_bezier(self, P: np.ndarray, U: np.ndarray,
+                        left_tan: np.ndarray, right_tan: np.ndarray) -> np.ndarray:
+        Q = P[self.idx]
+        P0, P3 = P[self.start], P[self.end]
+        B = _basis(U)
+        A0 = B[:, 1:2] * left_tan[self.seg]
+        A1 = B[:, 2:3] * right_tan[self.seg]
+        tmp = Q - (B[:, 0:1]*P0[self.seg] + B[:, 3:4]*P3[self.seg])
+
+        C = np.empty((len(self.start), 2, 2))
+        C[:,0,0] = self.sum(np.einsum("ij,ij->i", A0, A0))
+        C[:,0,1] = C[:,1,0] = self.sum(np.einsum("ij,ij->i", A0, A1))
+        C[:,1,1] = self.sum(np.einsum("ij,ij->i", A1, A1))
+        X = np.stack([self.sum(np.einsum("ij,ij->i", A0, tmp)),
+                      self.sum(np.einsum("ij,ij->i", A1, tmp))], axis=1)
+
+        chord = np.linalg.norm(P3 - P0, axis=1)
+        det = C[:,0,0]*C[:,1,1] - C[:,1,0]*C[:,0,1]
+        solvable = np.abs(det) > 1e-12
+        C[~solvable] = np.eye(2)
+        alpha = np.einsum("kij,kj->ki", np.linalg.inv(C), X)
+        alpha[~solvable] = (chord/3.0)[~solvable, None]
+        degenerate = (alpha < 1e-6).any(axis=1)
+        alpha[degenerate] = (chord/3.0)[degenerate, None]
+
+        ctrl = np.empty((len(self.start), 4, 2))
+        ctrl[:, 0] = P0
+        ctrl[:, 1] = P0 + left_tan * alpha[:, :1]
+        ctrl[:, 2] = P3 + right_tan * alpha[:, 1:]
+        ctrl[:, 3] = P3
+        return ctrl
+
+    def find_max_error(self, P: np.ndarray, ctrl: np.ndarray, U: np.ndarray):
+        v = np.einsum("ik,ikj->ij", _basis(U), ctrl[self.seg]) - P[self.idx]
+        e = v[:,0]*v[:,0] + v[:,1]*v[:,1]
+        e[self.first] = -np.inf
+        e[self.last] = -np.inf
+        max_err = np.maximum.reduceat(e, self.first)
+        local = np.arange(len(e)) - np.repeat(self.first, self.lens)
+        hit = np.where(e == max_err[self.seg], local, len(e))
+        split_i = np.minimum.reduceat(hit, self.first)
+        none = self.lens < 3
+        split_i[none] = self.lens[none] // 2
+        max_err[none] = -1.0
+        return split_i, max_err
+
+    def reparameterize(self, P: np.ndarray, ctrl: np.ndarray, U: np.ndarray) -> np.ndarray:
+        K = ctrl[self.seg]
+        t = U[:, None]; mt = 1.0 - t
+        d  = np.einsum("ik,ikj->ij", _basis(U), K) - P[self.idx]
+        Q1 = 3.0 * ((K[:,1] - K[:,0])*mt*mt + 2.0*(K[:,2] - K[:,1])*mt*t + (K[:,3] - K[:,2])*t*t)
+        Q2 = 6.0 * ((K[:,2] - 2.0*K[:,1] + K[:,0])*mt + (K[:,3] - 2.0*K[:,2] + K[:,1])*t)
+        num = np.einsum("ij,ij->i", d, Q1)
+        den = np.einsum("ij,ij->i", Q1, Q1) + np.einsum("ij,ij->i", d, Q2)
+        small = np.abs(den) < 1e-12
+        out = U - num / np.where(small, 1.0, den)
+        out[small] = U[small]
+        out = np.clip(out, 0.0, 1.0)
+        bad = np.flatnonzero(out[1:] <= out[:-1]) + 1
+        bad = bad[self.seg[bad] == self.seg[bad - 1]]
+        for j in np.unique(self.seg[bad]):
+            a, b = self.first[j], self.last[j] + 1
+            vals = out[a:b].tolist()
+            for i in range(1, len(vals)):
+                if vals[i] <= vals[i-1]:
+                    vals[i] = min(1.0, vals[i-1] + 1e-4)
+            out[a:b] = vals
+        return out
 
 def _generate_bezier(P: np.ndarray, U: np.ndarray,
                      left_tan: np.ndarray, right_tan: np.ndarray) -> CurveSeg:
-    n = len(P) - 1
-    A = np.zeros((n+1, 2, 2), dtype=np.float64)
-    for i in range(n+1):
-        t = U[i]; b = _basis(t)
-        A[i,0,:] = left_tan * b[1]
-        A[i,1,:] = right_tan * b[2]
-
-    C = np.zeros((2,2), dtype=np.float64)
-    X = np.zeros(2, dtype=np.float64)
-    for i in range(n+1):
-        t = U[i]; b = _basis(t)
-        tmp = P[i] - (P[0]*b[0] + P[-1]*b[3])
-        C[0,0] += np.dot(A[i,0], A[i,0])
-        C[0,1] += np.dot(A[i,0], A[i,1])
-        C[1,0] += np.dot(A[i,1], A[i,0])
-        C[1,1] += np.dot(A[i,1], A[i,1])
-        X[0]   += np.dot(A[i,0], tmp)
-        X[1]   += np.dot(A[i,1], tmp)
+    B = _basis(U)
+    A0 = B[:, 1:2] * left_tan
+    A1 = B[:, 2:3] * right_tan
+    tmp = P - (np.outer(B[:, 0], P[0]) + np.outer(B[:, 3], P[-1]))
+
+    C = np.empty((2,2), dtype=np.float64)
+    C[0,0] = np.einsum("ij,ij->", A0, A0)
+    C[0,1] = C[1,0] = np.einsum("ij,ij->", A0, A1)
+    C[1,1] = np.einsum("ij,ij->", A1, A1)
+    X = np.array([np.einsum("ij,ij->", A0, tmp), np.einsum("ij,ij->", A1, tmp)])
 
     detC0C1 = C[0,0]*C[1,1] - C[1,0]*C[0,1]
     alpha_l = alpha_r = 0.0
@@ -102,27 +338,34 @@ def _generate_bezier(P: np.ndarray, U: np.ndarray,
     return (tuple(P[0]), tuple(C1), tuple(C2), tuple(P[-1]))
 
 def _find_max_error(P: np.ndarray, C: CurveSeg, U: np.ndarray):
-    p0, c1, c2, p3 = [np.asarray(x, dtype=np.float64) for x in C]
-    max_err = -1.0; split_i = len(P)//2
-    for i in range(1, len(P)-1):
-        t = U[i]
-        Q = _bezier_point(p0, c1, c2, p3, t)
-        v = Q - P[i]
-        e = v[0]*v[0] + v[1]*v[1]
-        if e > max_err:
-            max_err = e
-            split_i = i
-    return split_i, max_err
+    if len(P) < 3:
+        return len(P)//2, -1.0
+    Q = _bezier_point(np.asarray(C, dtype=np.float64), U[1:-1])
+    v = Q - P[1:-1]
+    e = v[:,0]*v[:,0] + v[:,1]*v[:,1]
+    i = int(np.argmax(e))
+    return i + 1, float(e[i])
 
 def _reparameterize(P: np.ndarray, C: CurveSeg, U: np.ndarray) -> np.ndarray:
-    p0, c1, c2, p3 = [np.asarray(x, dtype=np.float64) for x in C]
-    out = np.empty_like(U)
-    for i, (Pi, ui) in enumerate(zip(P, U)):
-        out[i] = _find_root(p0, c1, c2, p3, Pi, ui)
+    ctrl = np.asarray(C, dtype=np.float64)
+    d  = _bezier_point(ctrl, U) - P
+    Q1 = _bezier_first_derivative(ctrl, U)
+    Q2 = _bezier_second_derivative(ctrl, U)
+    num = np.einsum("ij,ij->i", d, Q1)
+    den = np.einsum("ij,ij->i", Q1, Q1) + np.einsum("ij,ij->i", d, Q2)
+    small = np.abs(den) < 1e-12
+    out = U - num / np.where(small, 1.0, den)
+    out[small] = U[small]
     out = np.clip(out, 0.0, 1.0)
-    for i in range(1, len(out)):
-        if out[i] <= out[i-1]:
-            out[i] = min(1.0, out[i-1] + 1e-4)
+    # Keep the parameters strictly increasing. Violations are rare, so only
+    # the tail starting at the first one is walked in Python.
+    bad = np.flatnonzero(out[1:] <= out[:-1])
+    if len(bad):
+        vals = out.tolist()
+        for i in range(int(bad[0]) + 1, len(vals)):
+            if vals[i] <= vals[i-1]:
+                vals[i] = min(1.0, vals[i-1] + 1e-4)
+        out = np.asarray(vals, dtype=np.float64)
     return out
 
 def _is_closed(pts: List[Point]) -> bool:
@@ -131,13 +374,12 @@ def _is_closed(pts: List[Point]) -> bool:
 def _prepare_points(pts: List[Point], closed: bool) -> np.ndarray:
     P = np.asarray(pts, dtype=np.float64)
     if closed:
-        turns = []
-        for i in range(1, len(P)-1):
-            v1 = _unit(P[i] - P[i-1]); v2 = _unit(P[i+1] - P[i])
-            ang = 1.0 - float(np.dot(v1, v2))
-            turns.append((ang, i))
-        turns.sort(reverse=True)
-        j = turns[0][1] if turns else 0
+        j = 0
+        if len(P) > 2:
+            v1 = _units(P[1:-1] - P[:-2]); v2 = _units(P[2:] - P[1:-1])
+            ang = 1.0 - np.einsum("ij,ij->i", v1, v2)
+            # sharpest turn, ties resolved towards the later vertex
+            j = len(ang) - int(np.argmax(ang[::-1]))
         P = np.vstack([P[j:], P[1:j+1]])
         if np.linalg.norm(P[0] - P[-1]) > 1e-6:
             P = np.vstack([P, P[0]])
@@ -157,33 +399,32 @@ def _chord_params(P: np.ndarray) -> np.ndarray:
     u[1:] = np.cumsum(d) / total
     return u
 
-def _basis(t: float) -> np.ndarray:
+def _basis(t) -> np.ndarray:
+    """Cubic Bernstein basis; an ``(n, 4)`` matrix for an array of ``t``."""
+    t = np.asarray(t, dtype=np.float64)
     mt = 1.0 - t
-    return np.array([mt*mt*mt, 3*mt*mt*t, 3*mt*t*t, t*t*t], dtype=np.float64)
+    return np.stack([mt*mt*mt, 3*mt*mt*t, 3*mt*t*t, t*t*t], axis=-1)
 
-def _bezier_point(p0, p1, p2, p3, t: float) -> np.ndarray:
-    b = _basis(t)
-    return b[0]*p0 + b[1]*p1 + b[2]*p2 + b[3]*p3
+def _bezier_point(ctrl: np.ndarray, t) -> np.ndarray:
+    return _basis(t) @ ctrl
 
-def _bezier_first_derivative(p0, p1, p2, p3, t: float) -> np.ndarray:
+def _bezier_first_derivative(ctrl: np.ndarray, t) -> np.ndarray:
+    t = np.asarray(t, dtype=np.float64)[..., None]
     mt = 1.0 - t
+    p0, p1, p2, p3 = ctrl
     return 3.0 * ( (p1 - p0)*mt*mt + 2.0*(p2 - p1)*mt*t + (p3 - p2)*t*t )
 
-def _bezier_second_derivative(p0, p1, p2, p3, t: float) -> np.ndarray:
+def _bezier_second_derivative(ctrl: np.ndarray, t) -> np.ndarray:
+    t = np.asarray(t, dtype=np.float64)[..., None]
+    p0, p1, p2, p3 = ctrl
     return 6.0 * ( (p2 - 2.0*p1 + p0)*(1.0 - t) + (p3 - 2.0*p2 + p1)*t )
 
-def _find_root(p0, p1, p2, p3, P, u: float) -> float:
-    Q  = _bezier_point(p0, p1, p2, p3, u)
-    Q1 = _bezier_first_derivative(p0, p1, p2, p3, u)
-    Q2 = _bezier_second_derivative(p0, p1, p2, p3, u)
-    num = (Q - P) @ Q1
-    den = (Q1 @ Q1) + (Q - P) @ Q2
-    if abs(den) < 1e-12:
-        return u
-    return u - num/den
-
-def _vsub(a, b): return np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)
 def _unit(v):
     v = np.asarray(v, dtype=np.float64)
     n = np.linalg.norm(v)
-    return v / n if n > 1e-12 else v
\ No newline at end of file
+    return v / n if n > 1e-12 else v
+
+def _units(V: np.ndarray) -> np.ndarray:
+    """Row-wise :func:`_unit`; zero-length rows are left untouched."""
+    n = np.linalg.norm(V, axis=1)
+    return V / np.where(n > 1e-12, n, 1.0)[:, None]
@@ -1,26 +1,50 @@
 from __future__ import annotations
 
+from typing import Tuple
+
 import numpy as np
 import cv2
 
+from .geometry import Contours
 
-def trace_bitmap(bitmap: np.ndarray) -> list[list[tuple[float, float]]]:
-    """Trace a bitmap image into vector paths using OpenCV contours.
+
+def trace_regions(bitmap: np.ndarray, holes: bool = True,
+                  offset: Tuple[int, int] = (0, 0)) -> Tuple[Contours, np.ndarray]:
+    """Trace outlines and, with ``holes``, the holes inside them.
 
     Args:
         bitmap: A binary image array where non-zero pixels represent the foreground.
+        holes: Follow the two-level contour hierarchy (``RETR_CCOMP``) instead of
+            outer contours only.
+        offset: Added to every point, to trace a crop in canvas coordinates.
 
     Returns:
-        A list of polylines, each represented as a list of ``(x, y)`` tuples.
+        The closed contours of at least three points, packed, and for each one
+        the index of the outline it is a hole of (``-1`` for outlines).
     """
 
     bw_u8 = (bitmap > 0).astype(np.uint8) * 255
-    contours, _ = cv2.findContours(bw_u8, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    paths: list[list[tuple[float, float]]] = []
-    for cnt in contours:
-        pts = [(float(x), float(y)) for x, y in cnt.reshape(-1, 2)]
-        if len(pts) >= 3 and pts[0] != pts[-1]:
-            pts.append(pts[0])
-        if len(pts) >= 3:
-            paths.append(pts)
-    return paths
+    mode = cv2.RETR_CCOMP if holes else cv2.RETR_EXTERNAL
+    contours, hierarchy = cv2.findContours(bw_u8, mode, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+    if not contours:
+        return Contours.pack([]), np.zeros(0, dtype=np.int64)
+    keep = np.array([len(c) >= 3 for c in contours], dtype=bool)
+    parent = hierarchy.reshape(-1, 4)[:, 3].astype(np.int64)
+    # Holes of dropped outlines go with them.
+    keep &= (parent < 0) | keep[np.maximum(parent, 0)]
+    new_index = np.cumsum(keep) - 1
+    parent = np.where(parent < 0, -1, new_index[np.maximum(parent, 0)])[keep]
+    packed = Contours.pack([c.reshape(-1, 2) for c, k in zip(contours, keep) if k]).closed()
+    return packed, parent
+
+
+def trace_bitmap(bitmap: np.ndarray) -> Contours:
+    """Trace a bitmap image into vector paths using OpenCV contours.
+
+    Args:
+        bitmap: A binary image array where non-zero pixels represent the foreground.
+
+    Returns:
+        The closed outer contours of at least three points, packed.
+    """
+    return trace_regions(bitmap, holes=False)[0]
@@ -2,99 +2,179 @@ from __future__ import annotations
 
 """Command line interface for bitmap2svg.
 
-This module exposes two commands:
+This module exposes three commands:
 
 ``vectorise``
     Convert a single image to SVG.
 
+``autotune``
+    Search per-image settings for the smallest SVG that passes the QA
+    thresholds.
+
 ``batch``
     Convert all images under a directory to SVG, optionally using multiple
-    threads for faster processing. Progress can be disabled with ``--quiet``.
+    worker processes (or threads) for faster processing. Progress can be
+    disabled with ``--quiet``.
 """
 
 import json
-from concurrent.futures import ThreadPoolExecutor
+import os
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 
 import typer
-from rich.progress import track
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn, TimeElapsedColumn
 
+from .autotune import autotune
 from .config import Settings
 from .ingest import load
-from .pipeline import vectorise
+from .workers.manifest import Manifest, settings_hash
+from .workers.pool import EXECUTORS, Outcome, output_path, run_batch
+from .workers.store import ResultStore, cached_vectorise
 
 app = typer.Typer(add_completion=False)
 
 
 @app.command("vectorise")
-def vectorise_cmd(input: str, out: str = "out.svg", cfg: str | None = None) -> None:
-    """Vectorise a single image ``input`` and write the SVG to ``out``."""
+def vectorise_cmd(input: str, out: str = "out.svg", cfg: str | None = None,
+                  store: str | None = None) -> None:
+    """Vectorise a single image ``input`` and write the SVG to ``out``.
+
+    ``store`` names a result store directory to reuse earlier results from.
+    """
     settings = Settings.model_validate_json(Path(cfg).read_text()) if cfg else Settings()
-    img = load(input)
-    res = vectorise(img, settings)
+    res = cached_vectorise(Path(input).read_bytes(), settings, _open_store(store))
     Path(out).write_text(res.svg_min, encoding="utf-8")
     typer.echo(json.dumps(res.metrics, indent=2))
 
 
-def _iter_images(src: Path) -> list[Path]:
-    """Return all image files under ``src`` that we know how to handle."""
-    return [
-        p
-        for p in src.glob("**/*.*")
-        if p.suffix.lower() in {".png", ".jpg", ".jpeg", ".webp"}
-    ]
+def _open_store(store: str | None) -> ResultStore | None:
+    return ResultStore(store) if store else None
 
 
-def _process(p: Path, dst: Path, settings: Settings):
-    """Process ``p`` returning a tuple of (ok, path, metrics_or_error)."""
-    try:
-        img = load(p)
-        res = vectorise(img, settings)
-        Path(dst, p.with_suffix(".svg").name).write_text(res.svg_min, encoding="utf-8")
-        return True, p, res.metrics
-    except Exception as e:  # pragma: no cover - exception path
-        return False, p, e
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+
+
+def _iter_images(src: Path) -> Iterator[Path]:
+    """Yield image files under ``src`` that we know how to handle.
+
+    The tree is walked lazily so work can start before the listing finishes.
+    """
+    for root, dirs, files in os.walk(src):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in IMAGE_SUFFIXES:
+                yield Path(root, name)
 
 
 @app.command("batch")
 def batch_cmd(
     src: str,
-    dst: str = "out",
+    dst: str = typer.Argument("out"),
     cfg: str | None = None,
     jobs: int = 1,
+    executor: str = "process",
+    chunksize: int = 4,
+    max_inflight: int = 0,
+    force: bool = False,
+    store: str | None = None,
     quiet: bool = False,
 ) -> None:
     """Vectorise all images in ``src`` placing results in ``dst``.
 
-    ``jobs`` controls the number of worker threads. When set to 1 the images are
-    processed sequentially. Set ``quiet`` to ``True`` to disable the progress
-    display which is useful for automated testing.
+    ``jobs`` controls the number of workers. When set to 1 the images are
+    processed sequentially. ``executor`` picks ``process`` workers (the default,
+    which scale across cores) or ``thread`` workers; each task handles
+    ``chunksize`` images and at most ``max_inflight`` tasks are queued at once
+    (default twice ``jobs``). The source tree is walked lazily and every SVG is
+    written as soon as it is ready.
+
+    A manifest in ``dst`` records every finished image, so re-runs skip
+    sources whose content and settings are unchanged and interrupted runs
+    resume; ``force`` reprocesses everything. ``store`` names a result store
+    directory shared with other runs, the service and the watcher. Set ``quiet`` to ``True`` to
+    disable the progress display which is useful for automated testing.
     """
 
+    if executor not in EXECUTORS:
+        raise typer.BadParameter(f"expected one of {', '.join(EXECUTORS)}", param_hint="--executor")
     settings = Settings.model_validate_json(Path(cfg).read_text()) if cfg else Settings()
     src_p = Path(src)
     dst_p = Path(dst)
     dst_p.mkdir(parents=True, exist_ok=True)
-    paths = _iter_images(src_p)
 
-    def iterator() -> Iterable:
-        if jobs > 1:
-            with ThreadPoolExecutor(max_workers=jobs) as ex:
-                yield from ex.map(lambda p: _process(p, dst_p, settings), paths)
+    manifest = Manifest.for_output(dst_p)
+    digest = settings_hash(settings)
+    skipped = 0
+
+    def todo() -> Iterator[Path]:
+        nonlocal skipped
+        for p in _iter_images(src_p):
+            if not force and manifest.is_current(p, digest):
+                skipped += 1
+                continue
+            yield p
+
+    def handle(outcome: Outcome) -> None:
+        if outcome.ok:
+            manifest.record(outcome.path, output_path(outcome.path, dst_p), digest,
+                            outcome.data, outcome.fingerprint)
+            typer.echo(f"OK {outcome.path.name}  {outcome.data}")
         else:
-            for p in paths:
-                yield _process(p, dst_p, settings)
+            typer.secho(f"FAIL {outcome.path}: {outcome.data}", fg="red")
 
-    it = iterator()
-    if not quiet:
-        it = track(it, total=len(paths), description="Vectorising")
+    def run(paths: Iterable[Path]):
+        return run_batch(paths, dst_p, settings, jobs=jobs, executor=executor,
+                         chunksize=chunksize, max_inflight=max_inflight,
+                         store=_open_store(store))
 
-    for ok, p, data in it:
-        if ok:
-            typer.echo(f"OK {p.name}  {data}")
+    try:
+        if quiet:
+            for outcome in run(todo()):
+                handle(outcome)
         else:
-            typer.secho(f"FAIL {p}: {data}", fg="red")
+            columns = (TextColumn("{task.description}"), BarColumn(), MofNCompleteColumn(), TimeElapsedColumn())
+            with Progress(*columns) as progress:
+                task = progress.add_task("Vectorising", total=None)
+
+                def discovered() -> Iterator[Path]:
+                    # The total grows as the walk finds more images.
+                    for n, p in enumerate(todo(), 1):
+                        progress.update(task, total=n)
+                        yield p
+
+                for outcome in run(discovered()):
+                    progress.advance(task)
+                    handle(outcome)
+    finally:
+        manifest.close()
+    if skipped:
+        typer.echo(f"Skipped {skipped} unchanged image(s)")
+
+
+@app.command("autotune")
+def autotune_cmd(
+    src: str,
+    dst: str = typer.Argument("out"),
+    cfg: str | None = None,
+    budget: int = 16,
+) -> None:
+    """Tune settings per image in ``src`` (a file or directory) for size.
+
+    Each image gets at most ``budget`` evaluations searching ``k_colors``,
+    ``rdp_epsilon`` and ``bezier.max_err_px`` for the smallest SVG meeting the
+    ``qa`` thresholds of ``cfg``. The SVG is written to ``dst`` and the chosen
+    settings are reported as one JSON line per image.
+    """
+    settings = Settings.model_validate_json(Path(cfg).read_text()) if cfg else Settings()
+    src_p = Path(src)
+    dst_p = Path(dst)
+    dst_p.mkdir(parents=True, exist_ok=True)
+    paths = [src_p] if src_p.is_file() else _iter_images(src_p)
+    for p in paths:
+        tuned = autotune(load(p, settings.ingest.decode_megapixels), settings, budget=budget)
+        output_path(p, dst_p).write_text(tuned.result.svg_min, encoding="utf-8")
+        typer.echo(json.dumps({"image": p.name, **tuned.report()}))
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -1,10 +1,27 @@
 from __future__ import annotations
+from typing import Literal
 from pydantic import BaseModel
 
 class SwarmCfg(BaseModel):
     iters: int = 80
     step: float = 0.8
 
+class IngestCfg(BaseModel):
+    max_megapixels: float = 0.0     # >0: segment and trace larger images at about this many pixels
+    refine: bool = False            # move boundaries onto the full-resolution edges (keeps full decode)
+
+    @property
+    def decode_megapixels(self) -> float:
+        """Cap for :func:`~bitmap2svg.ingest.load`: refining needs the full image."""
+        return 0.0 if self.refine else self.max_megapixels
+
+class SegmentCfg(BaseModel):
+    quantize_bits: int = 5          # bits per channel of the colour histogram (8 = exact colours)
+    max_colors: int = 4096          # more occupied histogram bins than this: treat as a photo
+    sample_pixels: int = 100_000    # pixels k-means sees in the photo fallback
+    seed: int = 0
+    despeckle: int = 3              # relabel pixels with this little same-label support in 3x3 (0: off)
+
 class SnapCfg(BaseModel):
     circle_tol: float = 1.3
     rect_iou: float = 0.95
@@ -12,22 +29,37 @@ class SnapCfg(BaseModel):
 class BezierCfg(BaseModel):
     max_err_px: float = 1.5
     max_segments: int = 256
+    corner_angle_deg: float = 70.0
 
 class QACfg(BaseModel):
+    mode: Literal["off", "sampled", "always"] = "always"
+    sample_every: int = 10          # "sampled": evaluate about one image in N
     ssim_scale: int = 4
     edge_iou_thresh: float = 0.97
     ssim_thresh: float = 0.97
+    renderer: Literal["native", "cairo"] = "native"
+    ssim_levels: int = 3            # pyramid levels averaged into the SSIM score
+    early_exit_margin: float = 0.0  # >0: decide at the coarsest scale when this clear of the threshold
 
 class SVGCfg(BaseModel):
     decimals: int = 3
     readable: bool = True
+    # "compact": one relative-command path per colour, shortest numbers, hex fills
+    encoding: Literal["plain", "compact"] = "plain"
 
 class Settings(BaseModel):
     k_colors: int = 4
     rdp_epsilon: float = 1.2
+    # "topology": trace the shared edges of all colour regions once (no gaps, no snapping)
+    trace_mode: Literal["layers", "topology"] = "layers"
+    # "layers": cut the holes of a shape that later layers do not paint over
+    holes: bool = True
     swarm: SwarmCfg = SwarmCfg()
+    ingest: IngestCfg = IngestCfg()
+    segment: SegmentCfg = SegmentCfg()
     snap: SnapCfg = SnapCfg()
     bezier: BezierCfg = BezierCfg()
     qa: QACfg = QACfg()
     svg: SVGCfg = SVGCfg()
-    use_llm: bool = False
\ No newline at end of file
+    use_llm: bool = False
+    autotune: int = 0               # >0: evaluate up to this many candidates for the smallest passing SVG
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""Array-backed geometry passed between pipeline stages.
+
+Polylines travel as :class:`Contours`, one packed ``(N, 2)`` float64 array plus
+CSR-style offsets, and the shapes that come out of snapping and fitting are
+small slotted records holding numbers or arrays. No stage builds per-point
+Python objects.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+
+class Contours:
+    """Packed polylines: contour ``i`` is ``coords[offsets[i]:offsets[i+1]]``."""
+
+    __slots__ = ("coords", "offsets")
+
+    def __init__(self, coords: np.ndarray, offsets: np.ndarray):
+        self.coords = coords
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, polylines: Iterable) -> "Contours":
+        """Pack point sequences (lists of pairs or ``(n, 2)`` arrays)."""
+        if isinstance(polylines, Contours):
+            return polylines
+        arrays = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polylines]
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum([len(a) for a in arrays], out=offsets[1:])
+        coords = np.concatenate(arrays) if offsets[-1] else np.zeros((0, 2), dtype=np.float64)
+        return cls(coords, offsets)
+
+    @classmethod
+    def concat(cls, parts: Sequence["Contours"]) -> "Contours":
+        if not parts:
+            return cls.pack([])
+        bases = np.cumsum([0] + [len(p.coords) for p in parts[:-1]])
+        offsets = np.concatenate([[0]] + [p.offsets[1:] + b for p, b in zip(parts, bases)])
+        return cls(np.concatenate([p.coords for p in parts]), offsets.astype(np.int64))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for a, b in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist()):
+            yield self.coords[a:b]
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def take(self, idx) -> "Contours":
+        """Contours at ``idx`` (indices or a boolean mask), gathered in one pass."""
+        idx = np.arange(len(self))[idx]
+        lens = self.lengths[idx]
+        offsets = np.zeros(len(idx) + 1, dtype=np.int64)
+        np.cumsum(lens, out=offsets[1:])
+        src = np.arange(offsets[-1]) + np.repeat(self.offsets[idx] - offsets[:-1], lens)
+        return Contours(self.coords[src], offsets)
+
+    def closed(self, min_len: int = 3) -> "Contours":
+        """Append the first point to contours of ``min_len``+ points that do not end on it."""
+        lens = self.lengths
+        if not len(lens):
+            return self
+        starts, ends = self.offsets[:-1], self.offsets[1:] - 1
+        need = lens >= min_len
+        need[need] = (self.coords[starts[need]] != self.coords[ends[need]]).any(axis=1)
+        if not need.any():
+            return self
+        new_lens = lens + need
+        offsets = np.zeros(len(lens) + 1, dtype=np.int64)
+        np.cumsum(new_lens, out=offsets[1:])
+        src = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], new_lens)
+        src[offsets[1:][need] - 1] = starts[need]
+        return Contours(self.coords[src], offsets)
+
+    def tolist(self) -> List[List[Tuple[float, float]]]:
+        return [[tuple(p) for p in c.tolist()] for c in self]
+
+    def __repr__(self) -> str:
+        return f"Contours({len(self)} contours, {len(self.coords)} points)"
+
+
+class Circle:
+    __slots__ = ("cx", "cy", "r")
+    kind = "circle"
+
+    def __init__(self, cx: float, cy: float, r: float):
+        self.cx, self.cy, self.r = cx, cy, r
+
+    def __repr__(self) -> str:
+        return f"Circle({self.cx:g}, {self.cy:g}, {self.r:g})"
+
+
+class Rect:
+    __slots__ = ("x", "y", "w", "h")
+    kind = "rect"
+
+    def __init__(self, x: float, y: float, w: float, h: float):
+        self.x, self.y, self.w, self.h = x, y, w, h
+
+    def __repr__(self) -> str:
+        return f"Rect({self.x:g}, {self.y:g}, {self.w:g}, {self.h:g})"
+
+
+class Polygon:
+    __slots__ = ("points",)
+    kind = "poly"
+
+    def __init__(self, points: np.ndarray):
+        self.points = points  # (n, 2)
+
+    def __repr__(self) -> str:
+        return f"Polygon({len(self.points)} points)"
+
+
+class BezierPath:
+    __slots__ = ("ctrl",)
+    kind = "bezier"
+
+    def __init__(self, ctrl: np.ndarray):
+        self.ctrl = ctrl  # (n, 4, 2) control points; segment i ends where i+1 starts
+
+    def __repr__(self) -> str:
+        return f"BezierPath({len(self.ctrl)} segments)"
+
+
+class CompoundPath:
+    __slots__ = ("rings",)
+    kind = "compound"
+
+    def __init__(self, rings: List[Union[Polygon, BezierPath]]):
+        # Closed rings filled together: outlines clockwise, holes counter-clockwise.
+        self.rings = rings
+
+    def __repr__(self) -> str:
+        return f"CompoundPath({len(self.rings)} rings)"
+
+
+Primitive = Union[Circle, Rect, Polygon, BezierPath, CompoundPath]
+
+
+def primitive(item) -> Primitive | None:
+    """Return ``item`` as a record, converting legacy ``(kind, payload)`` tuples."""
+    if not isinstance(item, tuple):
+        return item
+    kind, payload = item
+    if kind == "circle":
+        return Circle(*payload)
+    if kind == "rect":
+        return Rect(*payload)
+    if kind == "poly":
+        return Polygon(np.asarray(payload, dtype=np.float64).reshape(-1, 2))
+    if kind == "bezier":
+        return BezierPath(np.asarray(payload, dtype=np.float64).reshape(-1, 4, 2))
+    if kind == "compound":
+        return CompoundPath([primitive(r) for r in payload])
+    return None
+
+
+def scaled(item, scale: Tuple[float, float], offset: Tuple[float, float] = (0.0, 0.0)) -> Primitive | None:
+    """``item`` mapped by ``x * scale + offset`` per axis; circle radii take the mean scale."""
+    prim = primitive(item)
+    if prim is None:
+        return None
+    (sx, sy), (ox, oy) = scale, offset
+    if prim.kind == "circle":
+        return Circle(prim.cx * sx + ox, prim.cy * sy + oy, prim.r * (sx + sy) / 2)
+    if prim.kind == "rect":
+        return Rect(prim.x * sx + ox, prim.y * sy + oy, prim.w * sx, prim.h * sy)
+    if prim.kind == "poly":
+        return Polygon(prim.points * scale + offset)
+    if prim.kind == "bezier":
+        return BezierPath(prim.ctrl * scale + offset)
+    return CompoundPath([scaled(r, scale, offset) for r in prim.rings])
+
+
+_KAPPA = 0.5522847498  # cubic handle length of a quarter circle, per radius
+
+
+def as_ring(prim: Primitive, clockwise: bool = True) -> Union[Polygon, BezierPath]:
+    """``prim`` as a closed ring for a :class:`CompoundPath`.
+
+    Circles become four cubic arcs and rects a closed polygon. The ring runs
+    clockwise on screen (y down) or, for holes, against it.
+    """
+    if prim.kind == "circle":
+        c, r = np.array([prim.cx, prim.cy]), prim.r
+        t = np.arange(5) * (np.pi / 2)
+        P = c + r * np.stack([np.cos(t), np.sin(t)], axis=1)
+        T = _KAPPA * r * np.stack([-np.sin(t), np.cos(t)], axis=1)
+        prim = BezierPath(np.stack([P[:-1], P[:-1] + T[:-1], P[1:] - T[1:], P[1:]], axis=1))
+    elif prim.kind == "rect":
+        x, y, w, h = prim.x, prim.y, prim.w, prim.h
+        prim = Polygon(np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h], [x, y]], dtype=np.float64))
+    P = prim.points if prim.kind == "poly" else prim.ctrl[:, :3].reshape(-1, 2)
+    area2 = np.dot(P[:, 0], np.roll(P[:, 1], -1)) - np.dot(np.roll(P[:, 0], -1), P[:, 1])
+    if (area2 > 0) != clockwise:
+        prim = Polygon(prim.points[::-1]) if prim.kind == "poly" else BezierPath(prim.ctrl[::-1, ::-1])
+    return prim
@@ -1,18 +1,71 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import io
 from pathlib import Path
-from typing import Tuple
+from typing import BinaryIO, Tuple
 import numpy as np
 from PIL import Image
 import cv2
 
-@dataclass
+def _reduce_factor(size: Tuple[int, int], max_megapixels: float) -> int:
+    """Smallest integer downscale that brings ``size`` to ``max_megapixels`` (0: no cap)."""
+    pixels = size[0] * size[1]
+    if max_megapixels <= 0 or pixels <= max_megapixels * 1e6:
+        return 1
+    return int(np.ceil(np.sqrt(pixels / (max_megapixels * 1e6))))
+
+@dataclass(eq=False, slots=True)
 class LoadedImage:
-    pil: Image.Image
+    """A decoded image: one read-only HxWx4 uint8 RGBA array.
+
+    ``gray`` and ``edges`` are derived on first access and then kept; the
+    decoder's PIL image is not retained (``pil`` wraps ``rgba`` again).
+    ``source_size`` is the size of the original when ``rgba`` is a reduced
+    copy of it; output coordinates are scaled back to it.
+    """
+
     rgba: np.ndarray          # HxWx4 uint8
-    gray: np.ndarray          # HxW uint8
-    edges: np.ndarray         # HxW float32 in [0,1]
     size: Tuple[int, int]     # (W,H)
+    source_size: Tuple[int, int] | None = None
+    _gray: np.ndarray | None = field(default=None, repr=False)
+    _edges: np.ndarray | None = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.source_size is None:
+            self.source_size = self.size
+
+    @property
+    def scale(self) -> Tuple[float, float]:
+        """Original pixels per pixel of ``rgba``, per axis."""
+        return self.source_size[0] / self.size[0], self.source_size[1] / self.size[1]
+
+    def reduced(self, max_megapixels: float) -> "LoadedImage":
+        """A copy of at most about ``max_megapixels``, or ``self`` if it fits."""
+        f = _reduce_factor(self.size, max_megapixels)
+        if f == 1:
+            return self
+        w, h = -(-self.size[0] // f), -(-self.size[1] // f)
+        rgba = cv2.resize(self.rgba, (w, h), interpolation=cv2.INTER_AREA)
+        rgba.flags.writeable = False
+        return LoadedImage(rgba=rgba, size=(w, h), source_size=self.source_size)
+
+    @property
+    def gray(self) -> np.ndarray:
+        """HxW uint8 luma."""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.rgba, cv2.COLOR_RGBA2GRAY)
+        return self._gray
+
+    @property
+    def edges(self) -> np.ndarray:
+        """HxW float32 Sobel magnitude in [0,1]."""
+        if self._edges is None:
+            self._edges = _sobel_edges(self.gray)
+        return self._edges
+
+    @property
+    def pil(self) -> Image.Image:
+        return Image.fromarray(self.rgba)
 
 def _sobel_edges(arr_u8: np.ndarray) -> np.ndarray:
     gx = cv2.Sobel(arr_u8, cv2.CV_32F, 1, 0, ksize=3)
@@ -21,16 +74,61 @@ def _sobel_edges(arr_u8: np.ndarray) -> np.ndarray:
     m = mag.max()
     return mag / m if m > 0 else mag
 
-def load(path: str | Path) -> LoadedImage:
-    pil = Image.open(path).convert("RGBA")
-    rgba = np.array(pil)
-    gray = cv2.cvtColor(rgba, cv2.COLOR_RGBA2GRAY)
-    edges = _sobel_edges(gray)
-    H, W = gray.shape
-    return LoadedImage(
-        pil=pil,
-        rgba=rgba,
-        gray=gray,
-        edges=edges,
-        size=(W, H),
-    )
\ No newline at end of file
+class _BufferReader(io.RawIOBase):
+    """Seekable read-only file over a bytes-like object, without copying it."""
+
+    def __init__(self, data):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        chunk = self._view[self._pos:self._pos + len(b)]
+        n = len(chunk)
+        memoryview(b).cast("B")[:n] = chunk
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+def load(src: str | Path | bytes | bytearray | memoryview | BinaryIO,
+         max_megapixels: float = 0.0) -> LoadedImage:
+    """Decode an image file, file object or in-memory encoded image.
+
+    The decoded pixels are exported once, straight into the returned array,
+    and the PIL image is closed. With ``max_megapixels`` larger images are
+    reduced by an integer factor while decoding: JPEG decodes at 1/2, 1/4 or
+    1/8 scale through ``draft``, and ``reduce`` box-filters the rest.
+    ``source_size`` keeps the original size.
+    """
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        src = _BufferReader(src)
+    with Image.open(src) as pil:
+        source = pil.size
+        im = pil
+        f = _reduce_factor(source, max_megapixels)
+        if f > 1:
+            im.draft(None, (-(-source[0] // f), -(-source[1] // f)))
+            if im.mode not in ("RGB", "RGBA", "L", "LA"):
+                im = im.convert("RGBA")
+            f = _reduce_factor(im.size, max_megapixels)
+            if f > 1:
+                im = im.reduce(f)
+        if im.mode != "RGBA":
+            im = im.convert("RGBA")
+        rgba = np.asarray(im)
+        if im is not pil:
+            im.close()
+    H, W = rgba.shape[:2]
+    return LoadedImage(rgba=rgba, size=(W, H), source_size=source)
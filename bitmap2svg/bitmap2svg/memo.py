@@ -0,0 +1,145 @@
+"""In-memory memoization keyed by buffer digests and bounded by bytes."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple
+
+import numpy as np
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    currsize: int  # bytes
+    maxsize: int  # bytes
+
+
+def digest(arr: np.ndarray) -> bytes:
+    """Fast 128-bit digest of an array's contents, shape and dtype.
+
+    The hash reads the array buffer in place; only non-contiguous inputs are
+    copied first.
+    """
+    arr = np.ascontiguousarray(arr)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{arr.dtype.str}{arr.shape}".encode("ascii"))
+    h.update(memoryview(arr).cast("B"))
+    return h.digest()
+
+
+def combine(*parts: Any) -> bytes:
+    """Digest of several key parts: digests, numbers, tuples or pydantic models."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if hasattr(part, "model_dump_json"):
+            part = part.model_dump_json()
+        h.update(part if isinstance(part, bytes) else repr(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.digest()
+
+
+_POINT_BYTES = 120  # 2-tuple of floats plus its list slot
+
+
+def approx_nbytes(obj: Any, _seen: set | None = None) -> int:
+    """Rough retained size of arrays, nested point lists and simple records.
+
+    An array referenced from several places (such as the label image all
+    layers of a segmentation share) is counted once.
+    """
+    seen = set() if _seen is None else _seen
+    if isinstance(obj, np.ndarray):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        return obj.nbytes
+    if isinstance(obj, (list, tuple)):
+        if obj and isinstance(obj[0], tuple) and obj[0] and isinstance(obj[0][0], float):
+            return sys.getsizeof(obj) + len(obj) * _POINT_BYTES
+        return sys.getsizeof(obj) + sum(approx_nbytes(o, seen) for o in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(approx_nbytes(v, seen) for v in obj.values())
+    if hasattr(obj, "__dict__"):
+        return sys.getsizeof(obj) + sum(approx_nbytes(v, seen) for v in vars(obj).values())
+    slots = getattr(type(obj), "__slots__", None)
+    if slots and not isinstance(obj, (str, bytes)):
+        return sys.getsizeof(obj) + sum(approx_nbytes(getattr(obj, n, None), seen) for n in slots)
+    return sys.getsizeof(obj)
+
+
+class DigestCache:
+    """Thread-safe LRU cache bounded by the total size of its values.
+
+    Keys should be compact digests (see :func:`digest`) rather than the data
+    itself. Each process owns its cache; the lock is recreated after ``fork``
+    so children never inherit it in a held state.
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = approx_nbytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = self.hits = self.misses = self.evictions = 0
+        _live_caches.add(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        nbytes = self.sizeof(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            if nbytes > self.max_bytes:
+                return
+            self._data[key] = (value, nbytes)
+            self._size += nbytes
+            while self._size > self.max_bytes:
+                _key, (_value, n) = self._data.popitem(last=False)
+                self._size -= n
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, computing and storing it on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, len(self._data),
+                             self._size, self.max_bytes)
+
+    def cache_clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size = self.hits = self.misses = self.evictions = 0
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+
+_live_caches: "weakref.WeakSet[DigestCache]" = weakref.WeakSet()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: [c._after_fork() for c in list(_live_caches)])
@@ -1,54 +1,308 @@
-"""Core vectorisation pipeline with caching and batching utilities."""
+"""Core vectorisation pipeline with caching and batching utilities.
+
+``vectorise`` runs explicit stages: segment -> trace -> simplify -> snap -> fit
+-> compose -> QA. With ``Settings.trace_mode == "topology"`` the trace stage
+extracts the shared edge network of all layers instead and snap is skipped.
+Images above ``IngestCfg.max_megapixels`` run through these stages on a
+reduced copy, optionally refined against the full image after simplify, and
+their geometry is scaled back to the original size.
+Every stage result is memoized under a key built from the key of its input and
+only the settings that stage reads, so re-running with a tweaked downstream
+parameter (say ``bezier.max_err_px``) reuses all upstream work. QA and the
+pretty SVG are only produced when an ``SVGResult`` is asked for them.
+"""
 
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import Iterable, List, Tuple
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Tuple
 
 import numpy as np
 
-from .bwtrace_cv2 import trace_bitmap
+from .bwtrace_cv2 import trace_regions
 
-from .bezier import fit as bezier_fit
+from .bezier import fit_layers, fit_packed
 from .config import Settings
+from .geometry import CompoundPath, Contours, Primitive, as_ring, scaled
 from .ingest import LoadedImage
+from .memo import CacheInfo, DigestCache, combine, digest
 from .qa import evaluate
-from .segment import mask_to_bw, to_layers
+from .refine import refine_band
+from .segment import label_image, mask_to_bw, to_layers
 from .simplify import rdp_all
-from .svg_io import compose
+from .svg_io import to_string
+from .topology import EdgeNetwork, assemble, crack_chains
 from .vector_critic import snap, SnapCfg
 
 
-@lru_cache(maxsize=128)
-def _trace_cached(bw_bytes: bytes, width: int, height: int) -> List[List[Tuple[float, float]]]:
-    """Trace binary image data with OpenCV and cache the result."""
-    bw_u8 = np.frombuffer(bw_bytes, dtype=np.uint8).reshape((height, width))
-    return trace_bitmap(bw_u8)
+# Traced contours keyed by a digest of the layer mask, bounded by the
+# approximate size of the cached polylines.
+_trace_cache = DigestCache(max_bytes=64 << 20)
+
+_stage_caches: Dict[str, DigestCache] = {
+    "segment": DigestCache(max_bytes=128 << 20),
+    "trace": _trace_cache,
+    "simplify": DigestCache(max_bytes=32 << 20),
+    "snap": DigestCache(max_bytes=32 << 20),
+    "fit": DigestCache(max_bytes=32 << 20),
+    "compose": DigestCache(max_bytes=32 << 20),
+    "qa": DigestCache(max_bytes=1 << 20),
+}
+
+
+def _stage(name: str, key: bytes, compute: Callable[[], Any]) -> Any:
+    return _stage_caches[name].get_or_compute(key, compute)
+
+
+def stage_cache_info() -> Dict[str, CacheInfo]:
+    """Hit/miss/eviction counters of every stage cache."""
+    return {name: cache.cache_info() for name, cache in _stage_caches.items()}
+
+
+def clear_stage_caches() -> None:
+    for cache in _stage_caches.values():
+        cache.cache_clear()
+
+
+Composed = List[Tuple[List[Primitive], Tuple[int, int, int, int]]]
+
+
+@dataclass(eq=False, slots=True)
+class SVGResult:
+    """Output of :func:`vectorise`.
+
+    ``svg_min`` is always produced. ``metrics``, ``svg_pretty`` and
+    ``geometry`` are derived on first access; ``metrics`` only runs QA when
+    ``QACfg.mode`` selects this image and otherwise holds just ``bytes``.
+    """
+
+    svg_min: str
+    _img: LoadedImage = field(repr=False)
+    _cfg: Settings = field(repr=False)
+    _composed: Composed = field(repr=False)
+    _img_key: bytes = field(repr=False)
+    _compose_key: bytes = field(repr=False)
+    _metrics: Dict[str, Any] | None = field(default=None, repr=False)
+    _pretty: str | None = field(default=None, repr=False)
+    _work: Composed | None = field(default=None, repr=False)  # in ``_img`` pixels when reduced
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        if self._metrics is None:
+            if _qa_selected(self._cfg.qa, self._img_key):
+                return self.run_qa()
+            self._metrics = self._sizes()
+        return self._metrics
+
+    def run_qa(self) -> Dict[str, Any]:
+        """Evaluate against the source image regardless of ``QACfg.mode``."""
+        if self._metrics is None or "ssim" not in self._metrics:
+            qa_cfg = self._cfg.qa
+            key = combine(self._compose_key, self._img_key,
+                          qa_cfg.model_dump_json(exclude={"mode", "sample_every"}))
+            work = self._composed if self._work is None else self._work
+            qa = _stage("qa", key, lambda: evaluate(self.svg_min, self._img, qa_cfg, work))
+            self._metrics = {**qa, **self._sizes()}
+        return self._metrics
+
+    def _sizes(self) -> Dict[str, Any]:
+        sizes = {"bytes": len(self.svg_min.encode("utf-8"))}
+        if self._cfg.svg.encoding == "compact":
+            plain = to_string(self._composed, self._img.source_size,
+                              self._cfg.svg.model_copy(update={"encoding": "plain"}))
+            sizes["bytes_saved"] = len(plain.encode("utf-8")) - sizes["bytes"]
+        return sizes
+
+    @property
+    def svg_pretty(self) -> str:
+        if self._pretty is None:
+            self._pretty = to_string(self._composed, self._img.source_size, self._cfg.svg, pretty=True)
+        return self._pretty
+
+    @property
+    def geometry(self) -> Composed:
+        """Per-layer ``([primitive, ...], rgba)`` records, background first.
+
+        Coordinates are those of the original image, also when it was
+        vectorised at a reduced size.
+        """
+        return self._composed
+
+
+def _qa_selected(cfg, img_key: bytes) -> bool:
+    if cfg.mode == "always":
+        return True
+    if cfg.mode == "off":
+        return False
+    # Sample on the image digest so the choice is stable across runs and workers.
+    return int.from_bytes(img_key[:8], "little") % max(1, cfg.sample_every) == 0
 
 
-def _trace(bw_u8: np.ndarray) -> List[List[Tuple[float, float]]]:
-    """Wrapper around the cached trace call using array data."""
-    h, w = bw_u8.shape
-    return _trace_cached(bw_u8.tobytes(), w, h)
+def _group_holes(prims: List[Primitive], parent: np.ndarray) -> List[Primitive]:
+    """Merge every outline with its holes into a :class:`CompoundPath`.
 
+    ``parent[i]`` is the outline ``prims[i]`` is a hole of, ``-1`` for
+    outlines. Outlines without holes are kept as they are, non-polygon
+    primitives first as before.
+    """
+    holes: Dict[int, List[int]] = {}
+    for i, p in enumerate(parent.tolist()):
+        if p >= 0:
+            holes.setdefault(p, []).append(i)
+    simple, bez, compound = [], [], []
+    for i, prim in enumerate(prims):
+        if parent[i] >= 0:
+            continue
+        if i in holes:
+            rings = [as_ring(prim)] + [as_ring(prims[h], clockwise=False) for h in holes[i]]
+            compound.append(CompoundPath(rings))
+        else:
+            (bez if prim.kind == "bezier" else simple).append(prim)
+    return simple + bez + compound
 
-def vectorise(img: LoadedImage, cfg: Settings):
-    """Vectorise a single loaded image into an SVG result."""
-    layers = to_layers(img, cfg)
+
+def _drop_short(lengths: np.ndarray, parent: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Contours to snap and their ``parent`` renumbered among themselves.
+
+    Snapping drops contours of fewer than 4 points; holes of dropped outlines
+    go too, so they are not painted as outlines of their own.
+    """
+    long = lengths >= 4
+    kept = np.flatnonzero(long & ((parent < 0) | long[np.maximum(parent, 0)]))
+    renum = np.full(len(lengths) + 1, -1, dtype=np.int64)
+    renum[kept] = np.arange(len(kept))
+    return kept, renum[parent[kept]]
+
+
+@dataclass(frozen=True, slots=True)
+class _FullRes:
+    """The full-resolution pixels behind a reduced working image."""
+
+    rgba: np.ndarray
+    key: bytes
+    scale: Tuple[float, float]
+
+    def refine(self, lines: Contours, target: np.ndarray, layers, corners: bool) -> Contours:
+        colors = np.array([layer.color[:3] for layer in layers])
+        return refine_band(lines, target, self.rgba, colors, self.scale, corners)
+
+
+def _layer_geometry(img: LoadedImage, cfg: Settings, layers, full: _FullRes | None = None):
+    """Trace, simplify and snap every layer mask on its own, then fit them together.
+
+    Masks, hole filling and tracing only cover each layer's bounding box.
+
+    With ``cfg.holes`` the holes of a mask through which a lower layer (or
+    transparency) must show travel as extra contours and come out as
+    compound paths; other holes are painted over as before.
+    """
+    snapped_by, parent_by, snap_keys = [], [], []
+    for i, layer in enumerate(layers):
+        # Work on the layer's bounding box; contours come back in canvas space.
+        keep_clear = label_image(img, layers, layer.bbox) < i if cfg.holes else None
+        bw = mask_to_bw(img, layer, keep_clear)
+        origin = layer.bbox[:2]
+        trace_key = combine(digest(bw), "regions", cfg.holes, origin)
+        seeds, parent = _stage("trace", trace_key, lambda: trace_regions(bw, cfg.holes, origin))
+        simplify_key = combine(trace_key, cfg.rdp_epsilon)
+        polys = _stage("simplify", simplify_key, lambda: rdp_all(seeds, epsilon=cfg.rdp_epsilon))
+        if full is not None:
+            simplify_key = combine(simplify_key, "refine", full.key)
+            coarse, target = polys, np.full(len(polys), i)
+            polys = _stage("simplify", simplify_key, lambda: full.refine(coarse, target, layers, False))
+        kept, kept_parent = _drop_short(polys.lengths, parent)
+        parent_by.append(kept_parent)
+        snap_key = combine(simplify_key, cfg.snap)
+        snap_keys.append(snap_key)
+        snapped_by.append(_stage("snap", snap_key, lambda: snap(polys.take(kept), cfg.snap)))
+
+    # Fit the leftover polylines of all layers in one batched pass.
+    layer_polys = [Contours.pack([p.points for p in snapped if p.kind == "poly"])
+                   for snapped in snapped_by]
+    fit_key = combine(*snap_keys, cfg.bezier)
+    fitted = _stage("fit", fit_key, lambda: fit_layers(layer_polys, cfg.bezier))
     composed = []
-    for layer in layers:
-        bw = mask_to_bw(img, layer)
-        seeds = _trace(bw)
-        polys = rdp_all(seeds, epsilon=cfg.rdp_epsilon)
-        snapped = snap(polys, cfg.snap)
-        items = [(t, p) for (t, p) in snapped if t in ("circle", "rect")]
-        poly_left = [p for (t, p) in snapped if t == "poly"]
-        bez = bezier_fit(poly_left, cfg.bezier)
-        items.extend(bez)
-        composed.append((items, layer.color))
-    svg = compose(composed, img.size, cfg.svg).minified
-    metrics = evaluate(svg, img, cfg.qa)
-    return type("SVGResult", (), {"svg_min": svg, "svg_pretty": svg, "metrics": metrics})
+    for snapped, bez, parent, layer in zip(snapped_by, fitted, parent_by, layers):
+        curves = iter(bez)
+        prims = [next(curves) if p.kind == "poly" else p for p in snapped]
+        composed.append((_group_holes(prims, parent), layer.color))
+    return fit_key, composed
+
+
+def _crack_chains(img: LoadedImage, layers) -> EdgeNetwork:
+    """The edge network of the box around all layers, in canvas coordinates."""
+    if not layers:
+        return crack_chains(np.full((1, 1), -1))
+    boxes = np.array([layer.bbox for layer in layers])
+    box = (*boxes[:, :2].min(axis=0).tolist(), *boxes[:, 2:].max(axis=0).tolist())
+    net = crack_chains(label_image(img, layers, box))
+    chains = net.chains
+    return net.with_chains(Contours(chains.coords + box[:2], chains.offsets))
+
+
+def _topology_geometry(img: LoadedImage, cfg: Settings, layers, seg_key: bytes,
+                       full: _FullRes | None = None):
+    """Trace the shared edge network of all layers once and fit every edge once.
+
+    Each layer becomes one compound path assembled from the fitted edges, so
+    neighbouring layers meet without gaps. Snapping is skipped: a primitive
+    could not share its outline with the neighbouring region.
+    """
+    trace_key = combine(seg_key, "topology")
+    traced = _stage("trace", trace_key, lambda: _crack_chains(img, layers))
+    simplify_key = combine(trace_key, cfg.rdp_epsilon)
+    net = _stage("simplify", simplify_key, lambda: traced.with_chains(
+        rdp_all(traced.chains, cfg.rdp_epsilon, close=False)))
+    if full is not None:
+        simplify_key = combine(simplify_key, "refine", full.key)
+        coarse = net
+        net = _stage("simplify", simplify_key, lambda: coarse.with_chains(
+            full.refine(coarse.chains, coarse.lo, layers, True)))
+    fit_key = combine(simplify_key, cfg.bezier)
+    compounds = _stage("fit", fit_key, lambda: assemble(
+        net, fit_packed(net.chains.coords, net.chains.offsets, cfg.bezier), len(layers)))
+    composed = [([c] if c is not None else [], layer.color)
+                for c, layer in zip(compounds, layers)]
+    return fit_key, composed
+
+
+def vectorise(img: LoadedImage, cfg: Settings) -> SVGResult:
+    """Vectorise a single loaded image into an SVG result.
+
+    Images above ``cfg.ingest.max_megapixels`` are segmented and traced on a
+    reduced copy (refined against ``img`` with ``cfg.ingest.refine``); the SVG
+    keeps the original size, ``img.source_size``, as its ``viewBox``.
+
+    With ``cfg.autotune`` the result is that of
+    :func:`~bitmap2svg.autotune.autotune` within that many evaluations.
+    """
+    if cfg.autotune > 0:
+        from .autotune import autotune  # autotune drives this function
+        return autotune(img, cfg.model_copy(update={"autotune": 0}), cfg.autotune).result
+    img_key = digest(img.rgba)
+    work, work_key, full = img.reduced(cfg.ingest.max_megapixels), img_key, None
+    if work is not img:
+        work_key = combine(img_key, "reduced", work.size)
+        if cfg.ingest.refine:
+            full = _FullRes(img.rgba, img_key, (img.size[0] / work.size[0], img.size[1] / work.size[1]))
+    seg_key = combine(work_key, cfg.k_colors, cfg.segment)
+    layers = _stage("segment", seg_key, lambda: to_layers(work, cfg))
+
+    if cfg.trace_mode == "topology":
+        fit_key, composed = _topology_geometry(work, cfg, layers, seg_key, full)
+    else:
+        fit_key, composed = _layer_geometry(work, cfg, layers, full)
+
+    out = composed
+    if work.size != work.source_size:
+        # Traced contours run through pixel centres, crack edges along pixel corners.
+        s = np.array(work.scale)
+        offset = (0.0, 0.0) if cfg.trace_mode == "topology" else tuple((s - 1) / 2)
+        out = [([scaled(p, work.scale, offset) for p in items], color) for items, color in composed]
+    compose_key = combine(fit_key, seg_key, work.size, work.source_size, cfg.svg)
+    svg = _stage("compose", compose_key, lambda: to_string(out, work.source_size, cfg.svg))
+    return SVGResult(svg, work, cfg, out, work_key, compose_key,
+                     _work=composed if out is not composed else None)
 
 
 def vectorise_batch(images: Iterable[LoadedImage], cfg: Settings):
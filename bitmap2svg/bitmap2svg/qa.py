@@ -1,37 +1,67 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, List, NamedTuple, Tuple
 import numpy as np
 import cv2
 from PIL import Image
 import io
-from cairosvg import svg2png  # pip install cairosvg
+from .memo import DigestCache, combine, digest
+from .raster import rasterize
 
-@dataclass
-class Metrics:
-    ssim: float
-    edge_iou: float
-    bytes: int
+_WIN, _SIGMA = (11, 11), 1.5  # Gaussian SSIM window of Wang et al. (2004)
+_C1, _C2 = (0.01*255)**2, (0.03*255)**2
+_MIN_SIDE = 16  # stop the pyramid before windows cover the whole level
 
-def _render_svg(svg_text: str, size: tuple[int,int], scale: int) -> np.ndarray:
-    W,H = size
-    png_bytes = svg2png(bytestring=svg_text.encode("utf-8"), output_width=W*scale, output_height=H*scale)
-    arr = np.array(Image.open(io.BytesIO(png_bytes)).convert("L"))
-    return arr
+# Target pyramids (with their window statistics and edges) are reused across
+# evaluations of the same image, e.g. by autotune.
+_target_cache = DigestCache(64 << 20)
+
+class _Stats(NamedTuple):
+    x: np.ndarray    # float32 pixels
+    mu: np.ndarray   # windowed mean
+    var: np.ndarray  # windowed variance
+
+def _blur(x: np.ndarray) -> np.ndarray:
+    return cv2.GaussianBlur(x, _WIN, _SIGMA, borderType=cv2.BORDER_REFLECT)
+
+def _stats(u8: np.ndarray) -> _Stats:
+    x = u8.astype(np.float32)
+    mu = _blur(x)
+    var = _blur(x*x)
+    var -= mu*mu
+    return _Stats(x, mu, var)
+
+def _ssim_stats(a: _Stats, b: _Stats) -> float:
+    mu_ab = a.mu*b.mu
+    cov = _blur(a.x*b.x)
+    cov -= mu_ab
+    num = mu_ab; num *= 2; num += _C1
+    cov *= 2; cov += _C2; num *= cov
+    den = a.mu*a.mu; den += b.mu*b.mu; den += _C1
+    var = a.var + b.var; var += _C2; den *= var
+    num /= den
+    return float(num.mean())
 
 def _ssim(a: np.ndarray, b: np.ndarray) -> float:
-    a64 = a.astype(np.float32) / 255.0
-    b64 = b.astype(np.float32) / 255.0
-    mu_a, mu_b = a64.mean(), b64.mean()
-    va, vb = a64.var(), b64.var()
-    cov = ((a64 - mu_a)*(b64 - mu_b)).mean()
-    C1, C2 = 0.01**2, 0.03**2
-    return float(((2*mu_a*mu_b + C1)*(2*cov + C2))/((mu_a**2 + mu_b**2 + C1)*(va + vb + C2) + 1e-8))
+    """Mean SSIM over Gaussian windows, computed with separable filters."""
+    return _ssim_stats(_stats(a), _stats(b))
+
+def _pyramid(u8: np.ndarray, levels: int) -> List[np.ndarray]:
+    out = [u8]
+    while len(out) < levels and min(out[-1].shape) >= 2*_MIN_SIDE:
+        out.append(cv2.pyrDown(out[-1]))
+    return out
+
+def _target(img, scale: int, levels: int) -> Tuple[List[_Stats], np.ndarray]:
+    def build():
+        tgt = cv2.resize(img.gray, (img.size[0]*scale, img.size[1]*scale),
+                         interpolation=cv2.INTER_NEAREST)
+        return [_stats(t) for t in _pyramid(tgt, levels)], _edges(tgt)
+    return _target_cache.get_or_compute(combine(digest(img.gray), scale, levels), build)
 
 def _edges(u8: np.ndarray) -> np.ndarray:
     gx = cv2.Sobel(u8, cv2.CV_32F, 1, 0, ksize=3)
     gy = cv2.Sobel(u8, cv2.CV_32F, 0, 1, ksize=3)
-    m = np.hypot(gx, gy)
+    m = cv2.magnitude(gx, gy)
     m = (m > (0.2*m.max())).astype(np.uint8)
     return m
 
@@ -40,10 +70,46 @@ def _edge_iou(a_edges: np.ndarray, b_edges: np.ndarray) -> float:
     union = np.logical_or(a_edges>0, b_edges>0).sum()
     return float(inter/union) if union else 1.0
 
-def evaluate(svg_text: str, img, cfg) -> Dict[str, Any]:
+def _render_svg(svg_text: str, size: tuple[int,int], scale: int) -> np.ndarray:
+    from cairosvg import svg2png  # pip install cairosvg
+    W,H = size
+    png_bytes = svg2png(bytestring=svg_text.encode("utf-8"), output_width=W*scale, output_height=H*scale)
+    arr = np.array(Image.open(io.BytesIO(png_bytes)).convert("L"))
+    return arr
+
+def _render(svg_text: str, img, cfg, composed, scale: int) -> np.ndarray:
+    if composed is not None and getattr(cfg, "renderer", "native") == "native":
+        return rasterize(composed, img.size, scale=scale)
+    return _render_svg(svg_text, img.size, scale=scale)
+
+def evaluate(svg_text: str, img, cfg, composed=None) -> Dict[str, Any]:
+    """Compare the SVG against ``img``.
+
+    When the pipeline's ``composed`` layers are given and ``cfg.renderer`` is
+    ``"native"`` they are rasterized directly; otherwise ``svg_text`` is
+    rendered through cairosvg. ``ssim`` is the windowed SSIM averaged over a
+    ``cfg.ssim_levels`` pyramid of the ``ssim_scale`` render. With
+    ``cfg.early_exit_margin`` set, a render at the coarsest scale is tried
+    first and returned when it passes or fails both thresholds by that margin.
+    """
     scale = getattr(cfg, "ssim_scale", 4)
-    tgt = cv2.resize(img.gray, (img.size[0]*scale, img.size[1]*scale), interpolation=cv2.INTER_NEAREST)
-    ren = _render_svg(svg_text, img.size, scale=scale)
-    ssim = _ssim(ren, tgt)
-    iou = _edge_iou(_edges(ren), _edges(tgt))
-    return {"ssim": ssim, "edge_iou": iou, "bytes": len(svg_text.encode("utf-8"))}
\ No newline at end of file
+    levels = max(1, getattr(cfg, "ssim_levels", 1))
+    nbytes = len(svg_text.encode("utf-8"))
+    margin = getattr(cfg, "early_exit_margin", 0.0)
+    coarse = max(1, scale >> (levels - 1))
+    if margin > 0 and coarse < scale:
+        ren = _render(svg_text, img, cfg, composed, coarse)
+        (tgt,), tgt_edges = _target(img, coarse, 1)
+        ssim = _ssim_stats(_stats(ren), tgt)
+        iou = _edge_iou(_edges(ren), tgt_edges)
+        clear_fail = ssim < cfg.ssim_thresh - margin or iou < cfg.edge_iou_thresh - margin
+        clear_pass = ssim >= cfg.ssim_thresh + margin and iou >= cfg.edge_iou_thresh + margin
+        if clear_fail or clear_pass:
+            return {"ssim": ssim, "edge_iou": iou, "bytes": nbytes,
+                    "ssim_levels": [ssim], "qa_scale": coarse}
+    tgt, tgt_edges = _target(img, scale, levels)
+    ren = _pyramid(_render(svg_text, img, cfg, composed, scale), len(tgt))
+    per_level = [_ssim_stats(_stats(r), t) for r, t in zip(ren, tgt)]
+    iou = _edge_iou(_edges(ren[0]), tgt_edges)
+    return {"ssim": float(np.mean(per_level)), "edge_iou": iou, "bytes": nbytes,
+            "ssim_levels": per_level, "qa_scale": scale}
@@ -0,0 +1,107 @@
+"""Narrow-band refinement of boundaries traced on a reduced image.
+
+With ``IngestCfg.max_megapixels`` the pipeline segments and traces a reduced
+copy of large inputs, so boundary points are only as precise as one reduced
+pixel. With ``IngestCfg.refine`` every point is then moved onto the edge in
+the full-resolution image. Only a band of one and a half
+reduced pixels on either side of the boundary is ever sampled.
+"""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+from .geometry import Contours
+
+_STEP = 0.5   # full-resolution pixels between samples along a normal
+_BAND = 1.5   # reduced pixels sampled on either side of a point
+
+
+def classify(rgba: np.ndarray, colors: np.ndarray) -> np.ndarray:
+    """Row of the nearest of ``colors`` for every ``(..., 4)`` pixel, -1 where transparent."""
+    d = ((rgba[..., None, :3].astype(np.int32) - colors.astype(np.int32))**2).sum(axis=-1)
+    return np.where(rgba[..., 3] > 10, d.argmin(axis=-1), -1)
+
+
+def _unit_normal(d: np.ndarray) -> np.ndarray:
+    length = np.maximum(np.hypot(d[:, 0], d[:, 1]), 1e-12)
+    return np.stack([d[:, 1], -d[:, 0]], axis=1) / length[:, None]
+
+
+def _edge_offset(P: np.ndarray, N: np.ndarray, target: np.ndarray, full: np.ndarray,
+                 colors: np.ndarray, r: float, corners: bool) -> np.ndarray:
+    """Signed distance along ``N`` from ``P`` to where ``target`` stops.
+
+    Samples ``full`` every ``_STEP`` pixels out to ``r`` both ways; NaN where
+    not exactly one end of the band shows ``target``.
+    """
+    t = np.arange(-r, r + _STEP / 2, _STEP)
+    S = P[:, None, :] + t[None, :, None] * N[:, None, :]
+    pix = np.floor(S if corners else S + 0.5).astype(np.int64)
+    H, W = full.shape[:2]
+    px, py = np.clip(pix[..., 0], 0, W - 1), np.clip(pix[..., 1], 0, H - 1)
+    inside = classify(full[py, px], colors) == target[:, None]
+    n_in = inside.sum(axis=1)
+    neg = inside[:, 0] & ~inside[:, -1]
+    pos = inside[:, -1] & ~inside[:, 0]
+    inset = 0.0 if corners else 0.5  # contours run through the centres of inside pixels
+    edge = np.where(neg, t[0] + (n_in - 0.5) * _STEP - inset, t[-1] - (n_in - 0.5) * _STEP + inset)
+    return np.where(neg | pos, edge, np.nan)
+
+
+def refine_band(lines: Contours, target: np.ndarray, full: np.ndarray, colors: np.ndarray,
+                scale: Tuple[float, float], corners: bool = False) -> Contours:
+    """Move the points of ``lines`` onto the edges of the full-resolution ``full``.
+
+    ``lines`` are in reduced-image coordinates, ``scale`` full pixels per
+    reduced pixel. ``target[i]`` is the row of ``colors`` painted on one side
+    of line ``i`` (-1: transparency). A point is moved along the bisector of
+    its two edge normals to where ``target`` stops; at corners turning by
+    more than 30 degrees both edges are moved instead, each measured at its
+    middle, and the point goes to where they meet. Lines whose last point
+    repeats the first are rings; the end points of other lines (the junctions
+    of shared edges) stay put. Coordinates are pixel corners with ``corners``
+    and, as traced contours, pixel centres otherwise.
+    """
+    if not len(lines.coords):
+        return lines
+    s = np.asarray(scale, dtype=np.float64)
+    off = np.zeros(2) if corners else (s - 1) / 2
+    F = lines.coords * s + off
+    n = len(F)
+    lens = lines.lengths
+    starts, ends = lines.offsets[:-1][lens > 0], lines.offsets[1:][lens > 0] - 1
+    ring = (lens[lens > 0] >= 4) & (F[starts] == F[ends]).all(axis=1)
+
+    prev, nxt = np.arange(n) - 1, np.arange(n) + 1
+    prev[starts[ring]] = ends[ring] - 1
+    movable = np.ones(n, dtype=bool)
+    movable[starts[~ring]] = movable[ends] = False
+    i = np.flatnonzero(movable)
+    na, nb = _unit_normal(F[i] - F[prev[i]]), _unit_normal(F[nxt[i]] - F[i])
+    tgt = target[np.repeat(np.arange(len(lines)), lens)[i]]
+    r = _BAND * float(s.max())
+
+    bis = na + nb
+    length = np.hypot(bis[:, 0], bis[:, 1])
+    bis /= np.maximum(length, 1e-12)[:, None]
+    move = _edge_offset(F[i], bis, tgt, full, colors, r, corners)[:, None] * bis
+    move[length < 1e-6] = np.nan
+
+    det = na[:, 0] * nb[:, 1] - na[:, 1] * nb[:, 0]
+    sharp = np.flatnonzero(np.abs(det) > 0.5)
+    if len(sharp):
+        j = i[sharp]
+        da = _edge_offset((F[prev[j]] + F[j]) / 2, na[sharp], tgt[sharp], full, colors, r, corners)
+        db = _edge_offset((F[j] + F[nxt[j]]) / 2, nb[sharp], tgt[sharp], full, colors, r, corners)
+        a, b, d = na[sharp], nb[sharp], det[sharp]
+        meet = np.stack([(da * b[:, 1] - db * a[:, 1]) / d, (a[:, 0] * db - b[:, 0] * da) / d], axis=1)
+        both = np.isfinite(meet).all(axis=1)
+        move[sharp[both]] = meet[both]
+
+    ok = np.isfinite(move).all(axis=1)
+    F[i[ok]] += move[ok]
+    F[ends[ring]] = F[starts[ring]]
+    return Contours((F - off) / s, lines.offsets)
@@ -1,70 +1,241 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Iterable, List, Tuple
+from dataclasses import dataclass, field
+from typing import List, Tuple
 import numpy as np
 import cv2
 
-@dataclass
+from .config import SegmentCfg
+
+NONE = 255  # label of pixels no layer paints
+_BLOCK_PIXELS = 1 << 18  # pixels labelled per block in ``_assign``
+
+def _bbox(mask: np.ndarray, origin: Tuple[int, int] = (0, 0)) -> Tuple[int, int, int, int]:
+    x, y, w, h = cv2.boundingRect(mask.view(np.uint8))
+    return x + origin[0], y + origin[1], x + w + origin[0], y + h + origin[1]
+
+def _intersect(a, b) -> Tuple[int, int, int, int] | None:
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[2], b[2]), min(a[3], b[3])
+    return (x0, y0, x1, y1) if x0 < x1 and y0 < y1 else None
+
+@dataclass(eq=False)
 class Layer:
-    mask: np.ndarray          # HxW uint8 (0/255)
+    """One flat colour of a segmentation.
+
+    The layers of a segmentation share one ``labels`` image (uint8, ``NONE``
+    where nothing is drawn) and own none of its pixels: the mask of label
+    ``index`` is derived when asked for, cropped to ``bbox`` (x0, y0, x1, y1).
+    """
+    labels: np.ndarray = field(repr=False)
+    index: int
     color: Tuple[int,int,int,int]  # RGBA
+    bbox: Tuple[int,int,int,int]
+    area: int                      # pixel count
 
-def _kmeans_palette(rgba: np.ndarray, k: int) -> np.ndarray:
-    H, W, _ = rgba.shape
-    X = rgba.reshape(-1, 4).astype(np.float32)
+    @classmethod
+    def from_mask(cls, mask: np.ndarray, color: Tuple[int,int,int,int]) -> "Layer":
+        """A stand-alone layer painting the non-zero pixels of ``mask``."""
+        on = mask > 0
+        labels = np.where(on, 0, NONE).astype(np.uint8)
+        return cls(labels, 0, color, _bbox(on), int(on.sum()))
+
+    def crop(self, box: Tuple[int, int, int, int] | None = None) -> np.ndarray:
+        """The 0/255 uint8 mask inside ``box``, by default ``bbox``."""
+        x0, y0, x1, y1 = box or self.bbox
+        return (self.labels[y0:y1, x0:x1] == self.index).view(np.uint8) * np.uint8(255)
+
+    @property
+    def mask(self) -> np.ndarray:
+        """The 0/255 uint8 mask at full image size."""
+        full = np.zeros(self.labels.shape, dtype=np.uint8)
+        x0, y0, x1, y1 = self.bbox
+        full[y0:y1, x0:x1] = self.crop()
+        return full
+
+def _histogram(rgb: np.ndarray, bits: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Occupied colour bins of ``(N, 3)`` uint8 pixels: mean colour and weight.
+
+    Pixels are binned on their top ``bits`` bits per channel; each bin stands
+    for the mean of its pixels, so flat colours come out exact.
+    """
+    shift = 8 - bits
+    q = (rgb >> shift).astype(np.int64)
+    code = (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+    if bits >= 7:  # too many bins for a dense histogram
+        code, code_idx = np.unique(code, return_inverse=True)
+        n = len(code)
+    else:
+        code_idx, n = code, 1 << (3 * bits)
+    count = np.bincount(code_idx, minlength=n)
+    sums = np.stack([np.bincount(code_idx, weights=rgb[:, c], minlength=n) for c in range(3)], axis=1)
+    occupied = count > 0
+    return sums[occupied] / count[occupied, None], count[occupied].astype(np.float64)
+
+def _weighted_kmeans(X: np.ndarray, w: np.ndarray, k: int, iters: int = 40) -> np.ndarray:
+    """Deterministic weighted k-means (Lloyd) over histogram entries.
+
+    Seeds greedily: the heaviest colour first, then the entry with the largest
+    weighted squared distance to the chosen centres.
+    """
+    centers = [X[np.argmax(w)]]
+    d2 = ((X - centers[0])**2).sum(axis=1)
+    for _ in range(1, k):
+        i = int(np.argmax(w * d2))
+        if d2[i] == 0:
+            break
+        centers.append(X[i])
+        d2 = np.minimum(d2, ((X - X[i])**2).sum(axis=1))
+    C = np.array(centers)
+    assign = None
+    for _ in range(iters):
+        new = np.argmin(((X[:, None, :] - C[None])**2).sum(axis=2), axis=1)
+        if assign is not None and (new == assign).all():
+            break
+        assign = new
+        wsum = np.bincount(assign, weights=w, minlength=len(C))
+        for c in range(3):
+            C[:, c] = np.where(wsum > 0, np.bincount(assign, weights=w * X[:, c], minlength=len(C))
+                               / np.maximum(wsum, 1e-12), C[:, c])
+    return C
+
+def _kmeans_palette(rgba: np.ndarray, k: int, cfg: SegmentCfg | None = None) -> np.ndarray:
+    cfg = cfg or SegmentCfg()
+    X = rgba.reshape(-1, 4)
     # Ignore transparent pixels in clustering
-    opaque = X[:,3] > 10
-    Xo = X[opaque][:,:3]  # RGB only
+    Xo = X[X[:, 3] > 10][:, :3]  # RGB only
     if len(Xo) == 0:
         # fallback single layer: black
         return np.array([[0,0,0,255]], dtype=np.uint8)
-    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 40, 0.5)
     k_eff = min(k, max(1, len(Xo)//200))  # guard against tiny images
-    if k_eff < 1: k_eff = 1
-    _ret, labels, centers = cv2.kmeans(Xo, k_eff, None, criteria, 3, cv2.KMEANS_PP_CENTERS)
+    colors, weights = _histogram(Xo, max(1, min(8, cfg.quantize_bits)))
+    if len(colors) <= cfg.max_colors:
+        centers = _weighted_kmeans(colors, weights, min(k_eff, len(colors)))
+    else:
+        # Photographic input: k-means on a fixed random subsample, seeded.
+        rng = np.random.default_rng(cfg.seed)
+        if len(Xo) > cfg.sample_pixels:
+            Xo = Xo[rng.choice(len(Xo), cfg.sample_pixels, replace=False)]
+        cv2.setRNGSeed(cfg.seed)
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 40, 0.5)
+        _ret, _labels, centers = cv2.kmeans(Xo.astype(np.float32), k_eff, None, criteria, 3,
+                                            cv2.KMEANS_PP_CENTERS)
     centers = np.clip(np.round(centers), 0, 255).astype(np.uint8)
     # Add alpha=255
     centers_rgba = np.concatenate([centers, 255*np.ones((centers.shape[0],1), dtype=np.uint8)], axis=1)
     return centers_rgba
 
-def to_layers(img, cfg) -> Iterable[Layer]:
-    """Segment into k flat-colour layers using k-means in RGB space (logos are flat)."""
+def _assign(rgba: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    """Nearest palette entry of every opaque pixel as a uint8 label image.
+
+    Transparent pixels get ``NONE``. Rows are processed in blocks of about
+    ``_BLOCK_PIXELS`` pixels, so the per-pixel distances to all ``K`` colours
+    never exist for the whole image at once. ``|c|^2 - 2 x.c`` ranks the
+    colours like the squared distance and is exact in float32 for 8-bit RGB.
+    """
+    H, W, _ = rgba.shape
+    C = palette[:, :3].astype(np.float32)
+    bias = (C * C).sum(axis=1)
+    labels = np.empty((H, W), dtype=np.uint8)
+    rows = max(1, _BLOCK_PIXELS // max(1, W))
+    for y in range(0, H, rows):
+        block = rgba[y:y + rows]
+        X = block[:, :, :3].reshape(-1, 3).astype(np.float32)
+        lab = np.argmin(bias - 2 * (X @ C.T), axis=1).astype(np.uint8).reshape(block.shape[:2])
+        lab[block[:, :, 3] <= 10] = NONE
+        labels[y:y + rows] = lab
+    return labels
+
+def _despeckle(labels: np.ndarray, support: int) -> np.ndarray:
+    """Hand pixels with little support in their 3x3 window to its majority label.
+
+    A pixel that shares its label with at most ``support`` pixels of the window
+    (itself included) takes the most frequent label there instead; with the
+    default of 3 that removes isolated pixels, pairs and one pixel wide lines.
+    Runs once for all labels, transparency (``NONE``) being one of them.
+    """
+    if support <= 0:
+        return labels
+    own = np.zeros(labels.shape, dtype=np.uint8)
+    best = np.zeros(labels.shape, dtype=np.uint8)
+    best_label = labels.copy()
+    for k in np.flatnonzero(np.bincount(labels.ravel(), minlength=256)).tolist():
+        ind = labels == k
+        votes = cv2.boxFilter(ind.view(np.uint8), -1, (3, 3), normalize=False,
+                              borderType=cv2.BORDER_CONSTANT)
+        np.copyto(own, votes, where=ind)
+        more = votes > best
+        np.copyto(best, votes, where=more)
+        best_label[more] = k
+    weak = own <= support
+    out = labels.copy()
+    out[weak] = best_label[weak]
+    return out
+
+def to_layers(img, cfg) -> List[Layer]:
+    """Segment into k flat-colour layers clustered in RGB space (logos are flat).
+
+    The palette comes from a colour histogram, so its cost does not grow with
+    the pixel count (see :class:`~bitmap2svg.config.SegmentCfg`). Pixels are
+    labelled in row blocks and despeckled once on the label image, which all
+    layers share; memory stays a few bytes per pixel whatever ``k_colors``.
+    Only the box around the opaque pixels is segmented: padded exports pay for
+    their content, not their canvas. Layers are sorted big to small so the
+    background is drawn first.
+    """
     rgba = img.rgba
     H, W, _ = rgba.shape
-    palette = _kmeans_palette(rgba, cfg.k_colors)
-
-    # Assign each pixel to nearest palette colour (RGB only, ignore transparent)
-    rgb = rgba[:,:,:3].astype(np.int16)
-    a = rgba[:,:,3]
-    layers: List[Layer] = []
-    for c in palette:
-        crgb = c[:3].astype(np.int16)
-        # L2 distance mask
-        dist = np.sum((rgb - crgb)**2, axis=2)
-        # For this simple approach, pick pixels closest to this center among all centers
-        # Compute winner-takes-all once:
-    # Precompute full assignment for all pixels
-    centers = palette[:,:3].astype(np.int16)
-    diff = rgb[:, :, None, :] - centers[None, None, :, :]
-    dists = np.sum(diff*diff, axis=3)  # HxWxK
-    assign = np.argmin(dists, axis=2)  # HxW
-
-    for idx, c in enumerate(palette):
-        mask = (assign == idx) & (a > 10)
-        mask_u8 = np.zeros((H,W), dtype=np.uint8)
-        mask_u8[mask] = 255
-        # Small cleanup: open/close to kill speckles
-        kernel = np.ones((3,3), np.uint8)
-        mask_u8 = cv2.morphologyEx(mask_u8, cv2.MORPH_OPEN, kernel, iterations=1)
-        mask_u8 = cv2.morphologyEx(mask_u8, cv2.MORPH_CLOSE, kernel, iterations=1)
-        if mask_u8.sum() == 0:
-            continue
-        layers.append(Layer(mask=mask_u8, color=tuple(int(x) for x in c)))
-    # Sort big → small to draw background first
-    layers.sort(key=lambda L: int(L.mask.sum()), reverse=True)
+    x0, y0, x1, y1 = _bbox(rgba[:, :, 3] > 10)
+    if x0 == x1:
+        return []
+    # Two pixels of transparency around the box keep the 3x3 despeckle exact.
+    x0, y0, x1, y1 = max(x0 - 2, 0), max(y0 - 2, 0), min(x1 + 2, W), min(y1 + 2, H)
+    roi = rgba[y0:y1, x0:x1]
+    palette = _kmeans_palette(roi, min(cfg.k_colors, NONE), cfg.segment)
+    labels = np.full((H, W), NONE, dtype=np.uint8)
+    labels[y0:y1, x0:x1] = _despeckle(_assign(roi, palette), cfg.segment.despeckle)
+    roi_labels = labels[y0:y1, x0:x1]
+    area = np.bincount(roi_labels.ravel(), minlength=NONE + 1)
+    layers = [Layer(labels, idx, tuple(int(x) for x in c), _bbox(roi_labels == idx, (x0, y0)), int(area[idx]))
+              for idx, c in enumerate(palette) if area[idx]]
+    layers.sort(key=lambda L: L.area, reverse=True)
     return layers
 
-def mask_to_bw(img, layer: Layer) -> np.ndarray:
-    """Return a binary (0/255) image for Potrace."""
+def label_image(img, layers: List[Layer], box: Tuple[int, int, int, int] | None = None) -> np.ndarray:
+    """int32 image of layer indices, -1 where nothing is drawn.
+
+    Later (smaller) layers win where masks overlap, as when drawing. With
+    ``box`` (x0, y0, x1, y1) only that window of the canvas is built.
+    """
+    H, W = img.rgba.shape[:2]
+    box = box or (0, 0, W, H)
+    lab = np.full((box[3] - box[1], box[2] - box[0]), -1, dtype=np.int32)
+    for idx, layer in enumerate(layers):
+        sub = _intersect(layer.bbox, box)
+        if sub is None:
+            continue
+        x0, y0, x1, y1 = sub
+        lab[y0 - box[1]:y1 - box[1], x0 - box[0]:x1 - box[0]][layer.crop(sub) > 0] = idx
+    return lab
+
+def mask_to_bw(img, layer: Layer, keep_clear: np.ndarray | None = None) -> np.ndarray:
+    """Return a binary (0/255) image for Potrace, cropped to ``layer.bbox``.
+
+    With ``keep_clear`` (a boolean image of the same window, marking pixels
+    this layer must not paint because a layer below or transparency shows
+    there), holes of the mask that contain none of them are filled in:
+    painting them is harmless, and cutting them would open hairline seams
+    against the layers on top.
+    """
     # Ensure outer background is 0, shape is 255
-    return layer.mask
\ No newline at end of file
+    mask = layer.crop()
+    if keep_clear is None:
+        return mask
+    n, comp = cv2.connectedComponents((mask == 0).astype(np.uint8), connectivity=4)
+    fill = np.bincount(comp[keep_clear], minlength=n) == 0
+    fill[0] = False  # component 0 is the mask itself
+    # Background touching the box edge continues outside it: not holes.
+    fill[np.concatenate([comp[0], comp[-1], comp[:, 0], comp[:, -1]])] = False
+    if not fill.any():
+        return mask
+    mask[fill[comp]] = 255
+    return mask
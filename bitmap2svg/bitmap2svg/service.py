@@ -1,9 +1,14 @@
-"""FastAPI service exposing vectorisation endpoints with caching and batching."""
+"""FastAPI service exposing vectorisation endpoints with caching and batching.
+
+Set ``BITMAP2SVG_STORE`` to a directory to keep results in a persistent store
+shared by every worker process (and by the CLI and watcher); otherwise a small
+in-process cache is used.
+"""
 
 from __future__ import annotations
 
+import os
 from functools import lru_cache
-from io import BytesIO
 from pathlib import Path
 from typing import List
 
@@ -13,17 +18,27 @@ from starlette.responses import JSONResponse
 from bitmap2svg.config import Settings
 from bitmap2svg.ingest import load
 from bitmap2svg.pipeline import vectorise
+from bitmap2svg.workers.store import ResultStore, StoredEntry, cached_vectorise
 
 
 app = FastAPI()
 
+_store = ResultStore(os.environ["BITMAP2SVG_STORE"]) if os.environ.get("BITMAP2SVG_STORE") else None
+
 
 @lru_cache(maxsize=32)
+def _vectorise_lru(data: bytes, cfg_json: str) -> StoredEntry:
+    # Keep only what the endpoints return, not the image and geometry behind it.
+    cfg = Settings.model_validate_json(cfg_json)
+    res = vectorise(load(data, cfg.ingest.decode_megapixels), cfg)
+    return StoredEntry(res.svg_min, res.metrics)
+
+
 def _vectorise_cached(data: bytes, cfg_json: str):
     """Cache the vectorisation of raw image bytes with a given config."""
-    cfg = Settings.model_validate_json(cfg_json)
-    img = load(BytesIO(data))
-    return vectorise(img, cfg)
+    if _store is not None:
+        return cached_vectorise(data, Settings.model_validate_json(cfg_json), _store)
+    return _vectorise_lru(data, cfg_json)
 
 
 @app.post("/vectorise")
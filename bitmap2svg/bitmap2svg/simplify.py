@@ -1,16 +1,60 @@
 from __future__ import annotations
-from typing import List, Tuple
+from typing import Iterable
 import numpy as np
-from rdp import rdp
-
-def rdp_all(seeds: list[list[tuple[float,float]]], epsilon: float) -> list[list[tuple[float,float]]]:
-    out: list[list[tuple[float,float]]] = []
-    for chain in seeds:
-        arr = np.asarray(chain, dtype=float)
-        simp = rdp(arr, epsilon=epsilon)
-        pts = [ (float(x), float(y)) for x,y in simp ]
-        # Ensure closed
-        if len(pts) >= 3 and pts[0] != pts[-1]:
-            pts.append(pts[0])
-        out.append(pts)
-    return out
\ No newline at end of file
+
+from .geometry import Contours
+
+def rdp_mask(coords: np.ndarray, offsets: np.ndarray, epsilon: float) -> np.ndarray:
+    """Ramer-Douglas-Peucker over every contour of a packed layout at once.
+
+    Returns the boolean mask of points to keep. All pending spans advance in
+    lock-step, so there is no recursion and one NumPy pass per level. A span
+    is split at the first point farthest from the line through its ends (from
+    its start point when both ends coincide) if that distance exceeds
+    ``epsilon``, matching the ``rdp`` package.
+    """
+    P = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    keep = np.ones(len(P), dtype=bool)
+    lens = np.diff(offsets)
+    s, e = offsets[:-1][lens > 2], offsets[1:][lens > 2] - 1
+    while len(s):
+        inner = e - s - 1
+        first = np.zeros(len(s), dtype=np.int64)
+        np.cumsum(inner[:-1], out=first[1:])
+        span = np.repeat(np.arange(len(s)), inner)
+        idx = np.arange(len(span)) + np.repeat(s + 1 - first, inner)
+
+        A, B, Q = P[s][span], P[e][span], P[idx]
+        dx, dy = B[:, 0] - A[:, 0], B[:, 1] - A[:, 1]
+        same = (dx == 0) & (dy == 0)
+        cross = np.abs(dx*(A[:, 1] - Q[:, 1]) - dy*(A[:, 0] - Q[:, 0]))
+        qx, qy = Q[:, 0] - A[:, 0], Q[:, 1] - A[:, 1]
+        d = np.where(same, np.sqrt(qx*qx + qy*qy),
+                     cross / np.where(same, 1.0, np.sqrt(dx*dx + dy*dy)))
+
+        dmax = np.maximum.reduceat(d, first)
+        hits = np.flatnonzero(d == dmax[span])
+        _, at = np.unique(span[hits], return_index=True)
+        split_at = idx[hits[at]]
+
+        split = dmax > epsilon
+        keep[idx[~split[span]]] = False
+        m = split_at[split]
+        s = np.concatenate([s[split], m])
+        e = np.concatenate([m, e[split]])
+        wide = e - s > 1
+        s, e = s[wide], e[wide]
+    return keep
+
+def rdp_all(seeds: Contours | Iterable, epsilon: float, close: bool = True) -> Contours:
+    """Simplify every contour with Ramer-Douglas-Peucker.
+
+    With ``close`` the results are rings again; open chains keep both ends.
+    """
+    seeds = Contours.pack(seeds)
+    keep = rdp_mask(seeds.coords, seeds.offsets, epsilon)
+    owner = np.repeat(np.arange(len(seeds)), seeds.lengths)
+    offsets = np.zeros(len(seeds) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owner[keep], minlength=len(seeds)), out=offsets[1:])
+    out = Contours(seeds.coords[keep], offsets)
+    return out.closed() if close else out
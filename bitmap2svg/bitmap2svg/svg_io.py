@@ -1,51 +1,197 @@
+"""SVG serialization of composed layers.
+
+The document is produced as a stream of text chunks straight from the
+geometry: path data for a whole contour is formatted with a single ``%``
+operation over its flattened coordinates, and nothing is re-parsed afterwards.
+Minified and pretty output differ only in the separators written between
+elements.
+
+With ``SVGCfg.encoding == "compact"`` every colour layer becomes a single
+compound path of relative commands (implicit repetition, shortest numbers,
+hex fill). Subpaths are normalized to one orientation so the default
+``nonzero`` fill rule paints their union; the holes of a compound path keep
+running against its outline and so stay empty.
+"""
+
 from __future__ import annotations
+import re
 from dataclasses import dataclass
-from typing import Iterable, Tuple
-import svgwrite
+from io import StringIO
+from typing import Iterable, Iterator, TextIO, Tuple
+
+import numpy as np
+
+from .geometry import primitive
+
+Layers = Iterable[Tuple[list, Tuple[int, int, int, int]]]
 
 @dataclass
 class SVGOut:
     minified: str
     pretty: str
 
-def _path_from_poly(dwg, pts):
-    d = f"M {pts[0][0]:.3f} {pts[0][1]:.3f} " + " ".join(f"L {x:.3f} {y:.3f}" for x,y in pts[1:]) + " Z"
-    return dwg.path(d=d)
+def _num(v: float, decimals: int) -> str:
+    return repr(round(float(v), decimals))
+
+def _fill(color) -> str:
+    return f"rgba({color[0]},{color[1]},{color[2]},{color[3]/255:.3f})"
+
+def _poly_d(pts: np.ndarray, decimals: int) -> str:
+    flat = pts.ravel()
+    n = len(flat) // 2
+    f = f"%.{decimals}f %.{decimals}f"
+    return ("M " + f + f" L {f}" * (n - 1) + " Z") % tuple(flat)
+
+def _bezier_d(ctrl: np.ndarray, decimals: int) -> str:
+    flat = np.concatenate([ctrl[0, 0], ctrl[:, 1:].ravel()])
+    f = f"%.{decimals}f"
+    seg = " C " + " ".join([f] * 6)
+    return ("M " + f + " " + f + seg * len(ctrl) + " Z") % tuple(flat)
+
+def _nonempty(ring) -> bool:
+    return len(ring.points if ring.kind == "poly" else ring.ctrl) > 0
+
+def _element(prim, fill: str, d: int) -> str | None:
+    kind = prim.kind if prim is not None else None
+    if kind == "circle":
+        return (f'<circle cx="{_num(prim.cx, d)}" cy="{_num(prim.cy, d)}" '
+                f'r="{_num(prim.r, d)}" fill="{fill}"/>')
+    if kind == "rect":
+        return (f'<rect x="{_num(prim.x, d)}" y="{_num(prim.y, d)}" width="{_num(prim.w, d)}" '
+                f'height="{_num(prim.h, d)}" fill="{fill}"/>')
+    if kind == "poly" and len(prim.points):
+        return f'<path d="{_poly_d(prim.points, d)}" fill="{fill}"/>'
+    if kind == "bezier" and len(prim.ctrl):
+        return f'<path d="{_bezier_d(prim.ctrl, d)}" fill="{fill}"/>'
+    if kind == "compound":
+        subs = [_poly_d(r.points, d) if r.kind == "poly" else _bezier_d(r.ctrl, d)
+                for r in prim.rings if _nonempty(r)]
+        if subs:
+            return f'<path d="{" ".join(subs)}" fill-rule="evenodd" fill="{fill}"/>'
+    return None
 
-def compose(paths_with_color: Iterable[tuple[list[tuple[str, list]], tuple[int,int,int,int]]],
-            size: tuple[int,int], cfg) -> SVGOut:
+_ZEROS = re.compile(r"(\.\d*?)0+(?= |$)")
+_DOT = re.compile(r"\.(?= |$)")
+_NEG_ZERO = re.compile(r"(?<![\d.])-0(?= |$)")
+_LEAD_ZERO = re.compile(r"(?<![\d.])0\.")
+_DOT_SEP = re.compile(r"(\.\d+) (?=\.)")
+
+def _short(nums, decimals: int) -> str:
+    """Format numbers with the fewest characters path data allows."""
+    nums = np.asarray(nums, dtype=np.float64).ravel()
+    if not len(nums):
+        return ""
+    s = " ".join([f"%.{decimals}f"] * len(nums)) % tuple(nums.tolist())
+    if decimals > 0:
+        s = _DOT.sub("", _ZEROS.sub(r"\1", s))   # 1.500 -> 1.5, 2.000 -> 2
+    s = _LEAD_ZERO.sub(".", _NEG_ZERO.sub("0", s))  # -0 -> 0, 0.5 -> .5
+    return _DOT_SEP.sub(r"\1", s.replace(" -", "-"))  # 1 -2 -> 1-2, 1.5 .5 -> 1.5.5
+
+def _hex(color) -> str:
+    h = "%02x%02x%02x" % tuple(color[:3])
+    return "#" + (h[::2] if h[::2] == h[1::2] else h)
+
+def _area2(P: np.ndarray) -> float:
+    """Twice the signed area; positive is clockwise on screen (y down)."""
+    x, y = P[:, 0], P[:, 1]
+    return float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+def _ring(prim, d: int):
+    """Rounded ring data of a poly or bezier and twice its signed area."""
+    if prim.kind == "poly":
+        if len(prim.points) < 2:
+            return None
+        P = np.round(prim.points, d)
+        if len(P) > 2 and (P[0] == P[-1]).all():
+            P = P[:-1]
+        return P, _area2(P)
+    if not len(prim.ctrl):
+        return None
+    R = np.round(prim.ctrl, d)
+    return R, _area2(R[:, :3].reshape(-1, 2))
+
+def _ring_d(kind: str, R: np.ndarray, flip: bool, start: np.ndarray, d: int):
+    if kind == "poly":
+        P = R[::-1] if flip else R
+        rel = np.round(np.diff(P, axis=0), d)
+        return f"m{_short(np.round(P[0] - start, d), d)}l{_short(rel, d)}z", P[0]
+    if flip:
+        R = R[::-1, ::-1]
+    p0 = R[0, 0]
+    cur = np.vstack([p0[None], R[:-1, 3]])
+    rel = np.round(R[:, 1:] - cur[:, None], d)
+    return f"m{_short(np.round(p0 - start, d), d)}c{_short(rel, d)}z", p0
+
+def _compact_d(items, d: int) -> str:
+    parts = []
+    start = np.zeros(2)  # after "z" the current point is the subpath start
+    for prim in map(primitive, items):
+        kind = prim.kind if prim is not None else None
+        if kind == "circle":
+            cx, cy, r = np.round([prim.cx, prim.cy, prim.r], d)
+            p0 = np.array([cx - r, cy])
+            arcs = _short([r, r, 0, 1, 1, 2*r, 0, r, r, 0, 1, 1, -2*r, 0], d)
+            parts.append(f"m{_short(np.round(p0 - start, d), d)}a{arcs}z")
+            start = p0
+        elif kind == "rect":
+            x, y, w, h = np.round([prim.x, prim.y, prim.w, prim.h], d)
+            p0 = np.array([x, y])
+            parts.append(f"m{_short(np.round(p0 - start, d), d)}h{_short([w], d)}"
+                         f"v{_short([h], d)}h{_short([-w], d)}z")
+            start = p0
+        elif kind in ("poly", "bezier"):
+            ring = _ring(prim, d)
+            if ring is not None:
+                part, start = _ring_d(kind, ring[0], ring[1] < 0, start, d)
+                parts.append(part)
+        elif kind == "compound":
+            # Holes run against their outline; only the whole path is turned.
+            rings = [(r.kind, _ring(r, d)) for r in prim.rings]
+            rings = [(k, ring) for k, ring in rings if ring is not None]
+            flip = sum(ring[1] for _, ring in rings) < 0
+            for k, (R, _area) in rings:
+                part, start = _ring_d(k, R, flip, start, d)
+                parts.append(part)
+    return "".join(parts)
+
+def iter_svg(layers: Layers, size: tuple[int, int], cfg, pretty: bool = False) -> Iterator[str]:
+    """Yield the SVG document for ``layers`` chunk by chunk."""
     W, H = size
-    dwg = svgwrite.Drawing(size=(W, H), viewBox=f"0 0 {W} {H}")
-    root = dwg.g(id="logo")
-    for items, color in paths_with_color:
-        rgba = f"rgba({color[0]},{color[1]},{color[2]},{color[3]/255:.3f})"
-        for typ, payload in items:
-            if typ == "circle":
-                cx, cy, r = payload
-                el = dwg.circle(center=(round(cx,cfg.decimals), round(cy,cfg.decimals)),
-                                r=round(r, cfg.decimals), fill=rgba)
-            elif typ == "rect":
-                x,y,w,h = payload
-                el = dwg.rect(insert=(round(x,cfg.decimals), round(y,cfg.decimals)),
-                              size=(round(w,cfg.decimals), round(h,cfg.decimals)),
-                              fill=rgba)
-            elif typ == "poly":
-                el = _path_from_poly(dwg, payload)
-                el.update(fill=rgba)
-            elif typ == "bezier":
-                if not payload:
-                    continue
-                p0 = payload[0][0]
-                d = f"M {p0[0]:.{cfg.decimals}f} {p0[1]:.{cfg.decimals}f} "
-                for (s0, c1, c2, s1) in payload:
-                    d += f"C {c1[0]:.{cfg.decimals}f} {c1[1]:.{cfg.decimals}f} " \
-                         f"{c2[0]:.{cfg.decimals}f} {c2[1]:.{cfg.decimals}f} " \
-                         f"{s1[0]:.{cfg.decimals}f} {s1[1]:.{cfg.decimals}f} "
-                el = dwg.path(d=d + "Z", fill=rgba)
-            else:
-                continue
-            root.add(el)
-    dwg.add(root)
-    pretty = dwg.tostring()
-    minified = " ".join(pretty.split())
-    return SVGOut(minified=minified, pretty=pretty)
\ No newline at end of file
+    nl, ind = ("\n", "  ") if pretty else ("", "")
+    yield (f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="{W}" height="{H}" '
+           f'viewBox="0 0 {W} {H}">{nl}{ind}<g id="logo">{nl}')
+    if getattr(cfg, "encoding", "plain") == "compact":
+        for items, color in layers:
+            d = _compact_d(items, cfg.decimals)
+            if d:
+                opacity = f' fill-opacity="{_short([color[3]/255], 3)}"' if color[3] < 255 else ""
+                yield f'{ind}{ind}<path fill="{_hex(color)}"{opacity} d="{d}"/>{nl}'
+        yield f"{ind}</g>{nl}</svg>{nl}"
+        return
+    for items, color in layers:
+        fill = _fill(color)
+        for prim in map(primitive, items):
+            el = _element(prim, fill, cfg.decimals)
+            if el is not None:
+                yield f"{ind}{ind}{el}{nl}"
+    yield f"{ind}</g>{nl}</svg>{nl}"
+
+def write_svg(layers: Layers, size: tuple[int, int], cfg, out: TextIO, pretty: bool = False) -> int:
+    """Stream the document to ``out`` (a text file, ``socket.makefile("w")``...).
+
+    Returns the number of characters written.
+    """
+    n = 0
+    for chunk in iter_svg(layers, size, cfg, pretty):
+        n += out.write(chunk)
+    return n
+
+def to_string(layers: Layers, size: tuple[int, int], cfg, pretty: bool = False) -> str:
+    buf = StringIO()
+    write_svg(layers, size, cfg, buf, pretty)
+    return buf.getvalue()
+
+def compose(paths_with_color: Layers, size: tuple[int, int], cfg) -> SVGOut:
+    layers = list(paths_with_color)
+    return SVGOut(minified=to_string(layers, size, cfg),
+                  pretty=to_string(layers, size, cfg, pretty=True))
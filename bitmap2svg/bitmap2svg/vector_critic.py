@@ -1,63 +1,107 @@
+"""Snap traced contours to circles and axis-aligned rectangles.
+
+All contours of a layer are judged together: moments, areas and bounding boxes
+come from per-contour reductions over the packed :class:`Contours` layout, the
+circle fit is solved in closed form for every contour at once, and the
+rectangle IoU of every contour that is not a circle comes from its shoelace
+area. shapely checks all those rings for self-intersections in one vectorised
+``is_simple`` call; only the rings that are not simple are repaired with
+``buffer(0)`` to measure their area.
+"""
+
 from __future__ import annotations
-from typing import List, Tuple, Sequence
+from typing import List, Tuple
 import numpy as np
-from shapely.geometry import Polygon
-from shapely.ops import unary_union
+import shapely
+
+from .config import SnapCfg
+from .geometry import Circle, Contours, Primitive, Rect, Polygon as Poly
 
 PathLike = List[Tuple[float, float]]
 
-class SnapCfg:
-    circle_tol: float = 1.3
-    rect_iou: float = 0.95
-
-def _fit_circle(points: Sequence[Tuple[float,float]], tol: float = 1.5):
-    pts = np.asarray(points, dtype=np.float64)
-    if len(pts) < 6:
-        return None
-    x, y = pts[:,0], pts[:,1]
-    x_m, y_m = x.mean(), y.mean()
-    u, v = x - x_m, y - y_m
-    Suu, Svv, Suv = np.dot(u,u), np.dot(v,v), np.dot(u,v)
-    Suuu, Svvv = np.dot(u, u*u), np.dot(v, v*v)
-    Suvv, Svuu = np.dot(u, v*v), np.dot(v, u*u)
-    A = np.array([[Suu, Suv], [Suv, Svv]])
-    B = 0.5 * np.array([Suuu + Suvv, Svvv + Svuu])
-    try:
-        cx, cy = np.linalg.solve(A, B) + np.array([x_m, y_m])
-    except np.linalg.LinAlgError:
-        return None
-    r = np.mean(np.sqrt((x - cx)**2 + (y - cy)**2))
-    res = np.std(np.sqrt((x - cx)**2 + (y - cy)**2))
-    if res < tol:
-        return (float(cx), float(cy), float(r))
-    return None
-
-def _fit_axis_rect(points: Sequence[Tuple[float,float]], iou_thresh: float=0.95):
-    poly = Polygon(points).buffer(0)
-    if not poly.is_valid:
-        return None
-    minx, miny, maxx, maxy = poly.bounds
-    rect = Polygon([(minx,miny),(maxx,miny),(maxx,maxy),(minx,maxy)])
-    denom = rect.union(poly).area
-    if denom == 0:
-        return None
-    iou = rect.intersection(poly).area / denom
-    if iou >= iou_thresh:
-        return (float(minx), float(miny), float(maxx-minx), float(maxy-miny))
-    return None
-
-def snap(polylines: List[PathLike], cfg: SnapCfg):
-    out = []
-    for pts in polylines:
-        if len(pts) < 4:
-            continue
-        circ = _fit_circle(pts, tol=cfg.circle_tol)
-        if circ:
-            out.append(("circle", circ))
-            continue
-        rect = _fit_axis_rect(pts, iou_thresh=cfg.rect_iou)
-        if rect:
-            out.append(("rect", rect))
-            continue
-        out.append(("poly", pts))
-    return out
\ No newline at end of file
+def _sums(owner: np.ndarray, n: int, *weights: np.ndarray) -> List[np.ndarray]:
+    return [np.bincount(owner, weights=w, minlength=n) for w in weights]
+
+def _fit_circles(C: Contours, owner: np.ndarray, tol: float) -> np.ndarray:
+    """Algebraic (Kasa) circle fit per contour; returns ``(n, 3)`` cx, cy, r
+    with NaN rows where the fit is singular or the radial residual std is
+    not below ``tol``. Needs 6+ points."""
+    n, lens = len(C), C.lengths
+    cnt = np.maximum(lens, 1).astype(np.float64)
+    x, y = C.coords[:, 0], C.coords[:, 1]
+    sx, sy = _sums(owner, n, x, y)
+    xm, ym = sx / cnt, sy / cnt
+    u, v = x - xm[owner], y - ym[owner]
+    uu, vv = u*u, v*v
+    Suu, Svv, Suv, Suuu, Svvv, Suvv, Svuu = _sums(owner, n, uu, vv, u*v, u*uu, v*vv, u*vv, v*uu)
+    Bu, Bv = 0.5*(Suuu + Suvv), 0.5*(Svvv + Svuu)
+    det = Suu*Svv - Suv*Suv
+    ok = (lens >= 6) & (det != 0)
+    det = np.where(ok, det, 1.0)
+    cx = xm + (Bu*Svv - Suv*Bv) / det
+    cy = ym + (Suu*Bv - Suv*Bu) / det
+    dist = np.hypot(x - cx[owner], y - cy[owner])
+    r = _sums(owner, n, dist)[0] / cnt
+    res = np.sqrt(_sums(owner, n, (dist - r[owner])**2)[0] / cnt)
+    ok &= res < tol
+    out = np.full((n, 3), np.nan)
+    out[ok] = np.stack([cx, cy, r], axis=1)[ok]
+    return out
+
+def _fit_rects(C: Contours, cand: np.ndarray, iou_thresh: float) -> np.ndarray:
+    """Bounding rectangle per candidate contour whose (repaired) polygon
+    covers at least ``iou_thresh`` of it; ``(n, 4)`` x, y, w, h with NaN rows
+    otherwise. Contours must be non-empty.
+
+    The polygon lies inside its bounds, so the IoU is its share of them. For
+    a simple ring that is the shoelace area over the bbox area; only rings
+    that are not simple need shapely's ``buffer(0)`` repair.
+    """
+    out = np.full((len(C), 4), np.nan)
+    idx = np.flatnonzero(cand)
+    if not len(idx):
+        return out
+    sub = C.take(idx)
+    n, starts = len(sub), sub.offsets[:-1]
+    x, y = sub.coords[:, 0], sub.coords[:, 1]
+    nxt = np.arange(len(x)) + 1
+    nxt[sub.offsets[1:] - 1] = starts
+    area = 0.5 * np.abs(_sums(np.repeat(np.arange(n), sub.lengths), n, x*y[nxt] - x[nxt]*y)[0])
+    x0, y0 = np.minimum.reduceat(x, starts), np.minimum.reduceat(y, starts)
+    w, h = np.maximum.reduceat(x, starts) - x0, np.maximum.reduceat(y, starts) - y0
+    rings = shapely.linearrings(sub.coords, indices=np.repeat(np.arange(n), sub.lengths))
+    simple = shapely.is_simple(rings)
+    twisted = np.flatnonzero(~simple)
+    if len(twisted):
+        fixed = shapely.buffer(shapely.polygons(rings[twisted]), 0)
+        bounds = shapely.bounds(fixed)
+        area[twisted] = np.where(shapely.is_valid(fixed), shapely.area(fixed), 0.0)
+        x0[twisted], y0[twisted] = bounds[:, 0], bounds[:, 1]
+        w[twisted], h[twisted] = bounds[:, 2] - x0[twisted], bounds[:, 3] - y0[twisted]
+    box = np.nan_to_num(w * h)
+    hit = (box > 0) & (area >= iou_thresh * box)
+    out[idx[hit]] = np.stack([x0, y0, w, h], axis=1)[hit]
+    return out
+
+def snap(polylines: Contours | List[PathLike], cfg: SnapCfg) -> List[Primitive]:
+    """Replace near-circles and near-rectangles by primitives; keep the rest as polygons."""
+    C = Contours.pack(polylines)
+    use = C.lengths >= 4
+    if not use.any():
+        return []
+    C = C.take(use)
+    owner = np.repeat(np.arange(len(C)), C.lengths)
+    circles = _fit_circles(C, owner, cfg.circle_tol)
+    is_circle = ~np.isnan(circles[:, 0])
+    rects = _fit_rects(C, ~is_circle, cfg.rect_iou)
+    is_rect = ~np.isnan(rects[:, 0])
+    out: List[Primitive] = []
+    for pts, circ, rect, c, r in zip(C, circles.tolist(), rects.tolist(),
+                                     is_circle.tolist(), is_rect.tolist()):
+        if c:
+            out.append(Circle(*circ))
+        elif r:
+            out.append(Rect(*rect))
+        else:
+            out.append(Poly(pts))
+    return out
@@ -0,0 +1,113 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from bitmap2svg import PIPELINE_VERSION
+from .cache import Cache
+
+MANIFEST_NAME = ".bitmap2svg-manifest.sqlite"
+
+Fingerprint = Tuple[int, int, str]
+
+def fingerprint_bytes(data: bytes, st: os.stat_result) -> Fingerprint:
+    return st.st_size, st.st_mtime_ns, hashlib.sha256(data).hexdigest()
+
+def fingerprint_file(path: str | Path) -> Fingerprint:
+    st = os.stat(path)
+    return fingerprint_bytes(Path(path).read_bytes(), st)
+
+def settings_hash(settings) -> str:
+    """Stable digest of a ``Settings`` model's JSON form and ``PIPELINE_VERSION``."""
+    h = hashlib.sha256(settings.model_dump_json().encode("utf-8"))
+    h.update(f"pipeline-{PIPELINE_VERSION}".encode("ascii"))
+    return h.hexdigest()
+
+class Manifest(Cache):
+    """Record of what a batch run has written to an output directory.
+
+    Each source is stored with its size, mtime and content hash, the settings
+    hash it was vectorised with, the SVG path and the metrics. A source is
+    up to date when all of those still match, so re-runs only process new,
+    modified or config-affected files and an interrupted run resumes where it
+    stopped.
+    """
+
+    def __init__(self, db_path: str | Path):
+        super().__init__(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    @classmethod
+    def for_output(cls, dst: str | Path) -> "Manifest":
+        return cls(Path(dst) / MANIFEST_NAME)
+
+    def _create_table(self):
+        super()._create_table()
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS manifest (
+                    source TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    hash TEXT,
+                    settings_hash TEXT,
+                    output TEXT,
+                    metrics TEXT,
+                    updated REAL
+                )
+            """)
+
+    def is_current(self, source: str | Path, settings_digest: str) -> bool:
+        """Return True if ``source`` was already vectorised with these settings."""
+        source = Path(source)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, hash, settings_hash, output FROM manifest WHERE source = ?",
+            (_key(source),),
+        ).fetchone()
+        if row is None:
+            return False
+        size, mtime_ns, file_hash, digest, output = row
+        if digest != settings_digest or not Path(output).exists():
+            return False
+        st = source.stat()
+        if st.st_size != size:
+            return False
+        if st.st_mtime_ns == mtime_ns:
+            return True
+        # Touched but possibly unchanged: fall back to the content hash.
+        if self._hash_file(source) != file_hash:
+            return False
+        with self.conn:
+            self.conn.execute("UPDATE manifest SET mtime_ns = ? WHERE source = ?",
+                              (st.st_mtime_ns, _key(source)))
+        return True
+
+    def record(self, source: str | Path, output: str | Path, settings_digest: str,
+               metrics: Dict[str, Any], fingerprint: Fingerprint | None = None):
+        """Store a finished source.
+
+        ``fingerprint`` is the ``(size, mtime_ns, sha256)`` taken when the
+        source was read; it is recomputed from disk when omitted.
+        """
+        source = Path(source)
+        size, mtime_ns, file_hash = fingerprint or fingerprint_file(source)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (_key(source), size, mtime_ns, file_hash, settings_digest,
+                 str(output), json.dumps(metrics), time.time()),
+            )
+            self.conn.execute("INSERT OR IGNORE INTO cache (hash, file_path) VALUES (?, ?)",
+                              (file_hash, str(source)))
+
+    def metrics(self, source: str | Path) -> Dict[str, Any] | None:
+        row = self.conn.execute("SELECT metrics FROM manifest WHERE source = ?",
+                                (_key(source),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+def _key(source: Path) -> str:
+    return os.path.abspath(source)
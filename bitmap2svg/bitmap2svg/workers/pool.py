@@ -0,0 +1,127 @@
+"""Parallel batch execution for the ``batch`` command.
+
+Vectorisation is mostly pure Python, so threads are capped by the GIL. The
+``process`` executor runs a pool of worker processes instead; every worker
+parses the settings once in its initializer and then handles chunks of paths,
+streaming results back in completion order.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Sequence
+
+from bitmap2svg.config import Settings
+from bitmap2svg.workers.manifest import Fingerprint, fingerprint_bytes
+from bitmap2svg.workers.store import ResultStore, cached_vectorise
+
+EXECUTORS = ("process", "thread")
+
+
+class Outcome(NamedTuple):
+    ok: bool
+    path: Path
+    data: object  # metrics on success, the error message otherwise
+    fingerprint: Fingerprint | None = None
+
+
+_settings: Settings | None = None
+_store: ResultStore | None = None
+
+
+def output_path(p: Path, dst: Path) -> Path:
+    return Path(dst, p.with_suffix(".svg").name)
+
+
+def vectorise_file(p: Path, dst: Path, settings: Settings, store: ResultStore | None = None) -> Outcome:
+    """Process ``p`` returning its outcome and the fingerprint of what was read.
+
+    With a ``store`` the result is looked up by content before vectorising.
+    """
+    try:
+        st = os.stat(p)
+        data = p.read_bytes()
+        res = cached_vectorise(data, settings, store)
+        output_path(p, dst).write_text(res.svg_min, encoding="utf-8")
+        return Outcome(True, p, res.metrics, fingerprint_bytes(data, st))
+    except Exception as e:  # pragma: no cover - exception path
+        return Outcome(False, p, str(e))
+
+
+def _init_worker(settings_json: str, store_dir: str | None) -> None:
+    global _settings, _store
+    _settings = Settings.model_validate_json(settings_json)
+    _store = ResultStore(store_dir) if store_dir else None
+
+
+def _run_chunk(paths: Sequence[Path], dst: Path, settings: Settings | None = None,
+               store: ResultStore | None = None) -> List[Outcome]:
+    if settings is None:
+        settings, store = _settings, _store
+    return [vectorise_file(p, dst, settings, store) for p in paths]
+
+
+def _chunks(paths: Iterable[Path], size: int) -> Iterator[List[Path]]:
+    chunk: List[Path] = []
+    for p in paths:
+        chunk.append(p)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _make_executor(kind: str, jobs: int, settings: Settings, store: ResultStore | None) -> Executor:
+    if kind == "process":
+        store_dir = str(store.root) if store is not None else None
+        return ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                   initargs=(settings.model_dump_json(), store_dir))
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=jobs)
+    raise ValueError(f"unknown executor {kind!r}; expected one of {', '.join(EXECUTORS)}")
+
+
+def run_batch(
+    paths: Iterable[Path],
+    dst: Path,
+    settings: Settings,
+    jobs: int = 1,
+    executor: str = "process",
+    chunksize: int = 4,
+    max_inflight: int = 0,
+    store: ResultStore | None = None,
+) -> Iterator[Outcome]:
+    """Vectorise ``paths`` into ``dst``, yielding outcomes as they complete.
+
+    With ``jobs`` of 1 the images are processed sequentially in this process.
+    Otherwise chunks of ``chunksize`` paths are handed to a ``process`` or
+    ``thread`` pool. ``paths`` is consumed lazily and at most ``max_inflight``
+    chunks (default ``2 * jobs``) are queued at any time, so memory stays flat
+    however large the corpus is. Results are shared through ``store`` when
+    given; process workers open their own handle on the same directory.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"unknown executor {executor!r}; expected one of {', '.join(EXECUTORS)}")
+    if jobs <= 1:
+        for p in paths:
+            yield vectorise_file(p, dst, settings, store)
+        return
+
+    limit = max_inflight if max_inflight > 0 else 2 * jobs
+    # Process workers get the settings once through their initializer.
+    local = (settings, store) if executor == "thread" else (None, None)
+    with _make_executor(executor, jobs, settings, store) as ex:
+        pending: set = set()
+        for chunk in _chunks(paths, max(1, chunksize)):
+            pending.add(ex.submit(_run_chunk, chunk, dst, *local))
+            if len(pending) >= limit:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    yield from fut.result()
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                yield from fut.result()
@@ -0,0 +1,162 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict
+
+from bitmap2svg import __version__
+from bitmap2svg.config import Settings
+from bitmap2svg.ingest import load
+from bitmap2svg.pipeline import Composed, SVGResult, vectorise
+from .manifest import settings_hash
+
+@dataclass
+class StoredEntry:
+    svg_min: str
+    metrics: Dict[str, Any]
+
+@dataclass(eq=False)
+class StoredResult:
+    """Output of :func:`cached_vectorise`, the same for store hits and misses.
+
+    ``svg_min`` and ``metrics`` are at hand either way. ``svg_pretty``,
+    ``geometry`` and ``run_qa`` need the full :class:`SVGResult`; after a hit
+    the source is vectorised again the first time one of them is used.
+    """
+
+    svg_min: str
+    metrics: Dict[str, Any]
+    _data: bytes = field(repr=False)
+    _settings: Settings = field(repr=False)
+    _result: SVGResult | None = field(default=None, repr=False)
+
+    @property
+    def result(self) -> SVGResult:
+        if self._result is None:
+            self._result = vectorise(load(self._data, self._settings.ingest.decode_megapixels),
+                                     self._settings)
+        return self._result
+
+    @property
+    def svg_pretty(self) -> str:
+        return self.result.svg_pretty
+
+    @property
+    def geometry(self) -> Composed:
+        return self.result.geometry
+
+    def run_qa(self) -> Dict[str, Any]:
+        self.metrics = self.result.run_qa()
+        return self.metrics
+
+class ResultStore:
+    """Content-addressed on-disk store of vectorisation results.
+
+    Results are keyed by the source bytes, the normalized settings and the
+    library and pipeline versions. Minified SVGs live as blob files next to a SQLite index
+    holding the metrics, sizes and last-access times; once the blobs exceed
+    ``max_bytes`` the least recently used entries are evicted. Several
+    processes may share one store directory.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int = 1 << 30):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        (self.root / "blobs").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.root / "index.sqlite", timeout=30.0,
+                                    check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                size INTEGER,
+                metrics TEXT,
+                last_access REAL
+            )
+        """)
+
+    @staticmethod
+    def key(data: bytes, settings: Settings) -> str:
+        h = hashlib.sha256()
+        h.update(hashlib.sha256(data).digest())
+        h.update(settings_hash(settings).encode("ascii"))
+        h.update(__version__.encode("utf-8"))
+        return h.hexdigest()
+
+    def _blob(self, key: str) -> Path:
+        return self.root / "blobs" / key[:2] / f"{key}.svg"
+
+    def get(self, key: str) -> StoredEntry | None:
+        with self._lock:
+            row = self.conn.execute("SELECT metrics FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                svg = self._blob(key).read_text(encoding="utf-8")
+            except FileNotFoundError:  # evicted by another process meanwhile
+                self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            self.conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+        return StoredEntry(svg_min=svg, metrics=json.loads(row[0]))
+
+    def put(self, key: str, svg: str, metrics: Dict[str, Any]):
+        blob = self._blob(key)
+        blob.parent.mkdir(exist_ok=True)
+        payload = svg.encode("utf-8")
+        # Write-then-rename so readers never see a partial blob.
+        fd, tmp = tempfile.mkstemp(dir=blob.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, blob)
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                              (key, len(payload), json.dumps(metrics), time.time()))
+            self._evict()
+
+    def _evict(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            victims = []
+            if total > self.max_bytes:
+                for key, size in self.conn.execute(
+                        "SELECT key, size FROM results ORDER BY last_access"):
+                    if total <= self.max_bytes:
+                        break
+                    victims.append(key)
+                    total -= size
+                self.conn.executemany("DELETE FROM results WHERE key = ?", [(k,) for k in victims])
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        for key in victims:
+            self._blob(key).unlink(missing_ok=True)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+def cached_vectorise(data: bytes, settings: Settings, store: ResultStore | None) -> StoredResult:
+    """Vectorise encoded image ``data``, going through ``store`` when given."""
+    key = hit = None
+    if store is not None:
+        key = ResultStore.key(data, settings)
+        hit = store.get(key)
+    if hit is not None:
+        return StoredResult(hit.svg_min, hit.metrics, data, settings)
+    res = vectorise(load(data, settings.ingest.decode_megapixels), settings)
+    if store is not None:
+        store.put(key, res.svg_min, res.metrics)
+    return StoredResult(res.svg_min, res.metrics, data, settings, res)
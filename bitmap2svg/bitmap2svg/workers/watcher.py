@@ -3,14 +3,17 @@ import os
 import time
 import threading
 from pathlib import Path
-from bitmap2svg.ingest import load
-from bitmap2svg.pipeline import vectorise
+from bitmap2svg.config import Settings
+from bitmap2svg.workers.store import ResultStore, cached_vectorise
 
 class Watcher:
-    def __init__(self, input_dir: str, output_dir: str, sleep_time: float = 1.0):
+    def __init__(self, input_dir: str, output_dir: str, sleep_time: float = 1.0,
+                 settings: Settings | None = None, store: ResultStore | None = None):
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.sleep_time = sleep_time
+        self.settings = settings or Settings()
+        self.store = store
         self.processed_files = set()
 
     def run(self):
@@ -26,16 +29,16 @@ class Watcher:
 
     def process_file(self, img_path: Path):
         try:
-            img = load(img_path)
-            res = vectorise(img, cfg=None)  # Replace cfg=None with actual config if needed
+            res = cached_vectorise(img_path.read_bytes(), self.settings, self.store)
             output_path = self.output_dir / f"{img_path.stem}.svg"
             output_path.write_text(res.svg_min, encoding="utf-8")
             print(f"Processed {img_path} -> {output_path}")
         except Exception as e:
             print(f"Failed to process {img_path}: {e}")
 
-def main(input_dir: str, output_dir: str):
-    watcher = Watcher(input_dir, output_dir)
+def main(input_dir: str, output_dir: str, store_dir: str | None = None):
+    store = ResultStore(store_dir) if store_dir else None
+    watcher = Watcher(input_dir, output_dir, store=store)
     watcher_thread = threading.Thread(target=watcher.run, daemon=True)
     watcher_thread.start()
     watcher_thread.join()
@@ -0,0 +1,120 @@
+"""Straightforward per-point reference implementations of the geometry engines.
+
+The parity tests check the batched engines against these, and running this
+file benchmarks the engines against them (``make bench``).
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from shapely.geometry import Polygon
+
+from bitmap2svg import bench, bezier
+from bitmap2svg.config import SnapCfg
+
+
+def ref_generate_bezier(P, U, left_tan, right_tan):
+    C = np.zeros((2,2)); X = np.zeros(2)
+    for i in range(len(P)):
+        b = bezier._basis(U[i])
+        a0 = left_tan * b[1]; a1 = right_tan * b[2]
+        tmp = P[i] - (P[0]*b[0] + P[-1]*b[3])
+        C[0,0] += np.dot(a0, a0); C[0,1] += np.dot(a0, a1)
+        C[1,0] += np.dot(a1, a0); C[1,1] += np.dot(a1, a1)
+        X[0] += np.dot(a0, tmp); X[1] += np.dot(a1, tmp)
+    seg_len = np.linalg.norm(P[-1] - P[0])
+    if abs(C[0,0]*C[1,1] - C[1,0]*C[0,1]) > 1e-12:
+        alpha_l, alpha_r = np.linalg.inv(C) @ X
+    else:
+        alpha_l = alpha_r = seg_len/3.0
+    if alpha_l < 1e-6 or alpha_r < 1e-6:
+        alpha_l = alpha_r = seg_len/3.0
+    return (tuple(P[0]), tuple(P[0] + left_tan*alpha_l),
+            tuple(P[-1] + right_tan*alpha_r), tuple(P[-1]))
+
+
+def ref_find_max_error(P, C, U):
+    ctrl = np.asarray(C, dtype=np.float64)
+    max_err = -1.0; split_i = len(P)//2
+    for i in range(1, len(P)-1):
+        v = bezier._basis(U[i]) @ ctrl - P[i]
+        e = v[0]*v[0] + v[1]*v[1]
+        if e > max_err:
+            max_err, split_i = e, i
+    return split_i, max_err
+
+
+def ref_reparameterize(P, C, U):
+    ctrl = np.asarray(C, dtype=np.float64)
+    out = np.empty_like(U)
+    for i, (Pi, u) in enumerate(zip(P, U)):
+        d = bezier._basis(u) @ ctrl - Pi
+        q1 = bezier._bezier_first_derivative(ctrl, u)
+        q2 = bezier._bezier_second_derivative(ctrl, u)
+        den = q1 @ q1 + d @ q2
+        out[i] = u if abs(den) < 1e-12 else u - (d @ q1)/den
+    out = np.clip(out, 0.0, 1.0)
+    for i in range(1, len(out)):
+        if out[i] <= out[i-1]:
+            out[i] = min(1.0, out[i-1] + 1e-4)
+    return out
+
+
+def ref_rdp(P, epsilon):
+    """Iterative per-point RDP, as in the ``rdp`` package."""
+    P = np.asarray(P, dtype=np.float64)
+    keep = np.ones(len(P), dtype=bool)
+    stack = [(0, len(P) - 1)] if len(P) > 2 else []
+    while stack:
+        a, b = stack.pop()
+        dmax, index = 0.0, a
+        for i in range(a + 1, b):
+            if (P[a] == P[b]).all():
+                d = np.linalg.norm(P[i] - P[a])
+            else:
+                D = P[b] - P[a]; Q = P[a] - P[i]
+                d = abs(D[0]*Q[1] - D[1]*Q[0]) / np.linalg.norm(D)
+            if d > dmax:
+                dmax, index = d, i
+        if dmax > epsilon:
+            stack += [(a, index), (index, b)]
+        else:
+            keep[a + 1:b] = False
+    return P[keep]
+
+
+def ref_snap(polylines, cfg: SnapCfg | None = None):
+    """Per-contour snapping with shapely objects, one contour at a time."""
+    cfg = cfg or SnapCfg()
+    out = []
+    for pts in polylines:
+        pts = np.asarray(pts, dtype=np.float64)
+        if len(pts) < 4:
+            continue
+        if len(pts) >= 6:
+            x, y = pts[:, 0], pts[:, 1]
+            u, v = x - x.mean(), y - y.mean()
+            A = np.array([[u @ u, u @ v], [u @ v, v @ v]])
+            B = 0.5 * np.array([u @ (u*u) + u @ (v*v), v @ (v*v) + v @ (u*u)])
+            try:
+                cx, cy = np.linalg.solve(A, B) + np.array([x.mean(), y.mean()])
+                d = np.sqrt((x - cx)**2 + (y - cy)**2)
+                if d.std() < cfg.circle_tol:
+                    out.append(("circle", (float(cx), float(cy), float(d.mean()))))
+                    continue
+            except np.linalg.LinAlgError:
+                pass
+        poly = Polygon(pts).buffer(0)
+        if poly.is_valid:
+            minx, miny, maxx, maxy = poly.bounds
+            rect = Polygon([(minx, miny), (maxx, miny), (maxx, maxy), (minx, maxy)])
+            denom = rect.union(poly).area
+            if denom and rect.intersection(poly).area / denom >= cfg.rect_iou:
+                out.append(("rect", (minx, miny, maxx - minx, maxy - miny)))
+                continue
+        out.append(("poly", pts))
+    return out
+
+
+if __name__ == "__main__":  # pragma: no cover
+    bench.main(ref_generate_bezier, ref_find_max_error, ref_reparameterize, ref_rdp, ref_snap)
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+from PIL import Image, ImageDraw
+from typer.testing import CliRunner
+
+from bitmap2svg.autotune import autotune
+from bitmap2svg.cli import app
+from bitmap2svg.config import QACfg, Settings
+from bitmap2svg.ingest import load
+from bitmap2svg.pipeline import clear_stage_caches, stage_cache_info, vectorise
+
+
+@pytest.fixture
+def logo_path(tmp_path):
+    im = Image.new("RGBA", (80, 60), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(im)
+    draw.ellipse((8, 8, 52, 52), fill=(220, 40, 40, 255))
+    draw.polygon([(44, 6), (76, 24), (54, 56)], fill=(30, 60, 200, 255))
+    path = tmp_path / "logo.png"
+    im.save(path)
+    return path
+
+
+def test_autotune_shrinks_output_within_budget(logo_path):
+    img = load(logo_path)
+    cfg = Settings(qa=QACfg(ssim_thresh=0.0, edge_iou_thresh=0.0))
+    clear_stage_caches()
+    tuned = autotune(img, cfg, budget=10)
+
+    assert tuned.passed
+    assert len(tuned.trials) <= 10
+    assert tuned.result.metrics["bytes"] <= vectorise(img, cfg).metrics["bytes"]
+    # Only the k_colors ladder needs fresh segmentations.
+    distinct_k = {t.settings.k_colors for t in tuned.trials}
+    assert stage_cache_info()["segment"].misses == len(distinct_k)
+
+
+def test_autotune_reports_failure(logo_path):
+    cfg = Settings(qa=QACfg(ssim_thresh=1.5, edge_iou_thresh=1.5))
+    tuned = autotune(load(logo_path), cfg, budget=4)
+    assert not tuned.passed
+    assert len(tuned.trials) == 4
+
+
+def test_vectorise_autotunes_with_a_budget(logo_path):
+    img = load(logo_path)
+    cfg = Settings(qa=QACfg(ssim_thresh=0.0, edge_iou_thresh=0.0))
+    tuned = autotune(img, cfg, budget=6)
+    res = vectorise(img, cfg.model_copy(update={"autotune": 6}))
+    assert res.svg_min == tuned.result.svg_min
+    assert res.metrics["bytes"] <= vectorise(img, cfg).metrics["bytes"]
+
+
+def test_autotune_cli(logo_path, tmp_path):
+    out = tmp_path / "out"
+    result = CliRunner().invoke(app, ["autotune", str(logo_path), str(out), "--budget", "3"])
+    assert result.exit_code == 0, result.output
+    report = json.loads(result.output.strip().splitlines()[-1])
+    assert report["image"] == "logo.png"
+    assert report["evaluations"] <= 3
+    assert {"k_colors", "rdp_epsilon", "max_err_px", "metrics"} <= set(report)
+    assert (out / "logo.svg").exists()
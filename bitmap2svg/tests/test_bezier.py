@@ -0,0 +1,63 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from _reference import ref_find_max_error, ref_generate_bezier, ref_reparameterize
+from bitmap2svg import bezier
+from bitmap2svg.bench import noisy_circle
+from bitmap2svg.config import BezierCfg
+
+@pytest.mark.parametrize("n", [5, 100, 2000])
+def test_vectorised_round_matches_reference(n):
+    P = bezier._prepare_points(noisy_circle(n, noise=1.0, seed=n), closed=True)
+    U = bezier._chord_params(P)
+    lt = bezier._unit(P[1] - P[0]); rt = -bezier._unit(P[-2] - P[-1])
+
+    C = bezier._generate_bezier(P, U, lt, rt)
+    np.testing.assert_allclose(C, ref_generate_bezier(P, U, lt, rt), atol=1e-9)
+
+    i, err = bezier._find_max_error(P, C, U)
+    ri, rerr = ref_find_max_error(P, C, U)
+    assert i == ri
+    assert err == pytest.approx(rerr)
+
+    np.testing.assert_allclose(bezier._reparameterize(P, C, U),
+                               ref_reparameterize(P, C, U), atol=1e-12)
+
+def test_fit_output_shape():
+    pts = [tuple(p) for p in noisy_circle(200)]
+    out = bezier.fit([pts, [(0.0, 0.0), (4.0, 0.0)]], BezierCfg())
+    assert [kind for kind, _ in out] == ["bezier", "bezier"]
+    segs = out[0][1]
+    assert segs[0][0] == segs[-1][3]
+    for a, b in zip(segs, segs[1:]):
+        assert a[3] == b[0]
+    assert out[1][1] == [((0.0, 0.0), (0.0, 0.0), (4.0, 0.0), (4.0, 0.0))]
+
+def test_fit_layers_matches_per_layer_fit():
+    polys = [[tuple(p) for p in noisy_circle(n, r=4 + n/20, noise=0.5, seed=n)]
+             for n in (4, 12, 60, 400)]
+    polys.append([(0.0, 0.0), (3.0, 4.0)])
+    layers = [polys[:2], [], polys[2:]]
+    cfg = BezierCfg()
+    batched = bezier.fit_layers(layers, cfg)
+    assert len(batched) == len(layers)
+    for polys_l, got in zip(layers, batched):
+        want = bezier.fit(polys_l, cfg)
+        assert len(got) == len(want)
+        for path, (_, b) in zip(got, want):
+            assert path.kind == "bezier"
+            np.testing.assert_allclose(path.ctrl, np.asarray(b, float).reshape(-1, 4, 2), atol=1e-6)
+
+def test_corners_become_segment_boundaries():
+    square = [(0.0, 0.0), (50.0, 0.0), (50.0, 50.0), (0.0, 50.0), (0.0, 0.0)]
+    segs = bezier.fit([square], BezierCfg())[0][1]
+    assert len(segs) == 4
+    ends = {tuple(float(v) for v in s[0]) for s in segs}
+    assert ends == {(0.0, 0.0), (50.0, 0.0), (50.0, 50.0), (0.0, 50.0)}
+
+@pytest.mark.parametrize("cap", [1, 7, 40])
+def test_max_segments_caps_each_contour(cap):
+    pts = [tuple(p) for p in noisy_circle(3000, noise=2.0, seed=3)]
+    cfg = BezierCfg(max_segments=cap)
+    assert len(bezier.fit([pts], cfg)[0][1]) == cap
+    assert len(bezier.fit_layers([[pts, pts]], cfg)[0][1].ctrl) == cap
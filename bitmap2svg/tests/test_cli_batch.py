@@ -1,6 +1,7 @@
 import base64
 from pathlib import Path
 
+import pytest
 from typer.testing import CliRunner
 
 from bitmap2svg.cli import app
@@ -27,3 +28,88 @@ def test_batch_parallel(tmp_path):
     assert (out / "a.svg").exists()
     assert (out / "b.svg").exists()
 
+
+
+def _write_logo(path: Path, size: int = 48) -> None:
+    from PIL import Image, ImageDraw
+
+    im = Image.new("RGBA", (size, size), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(im)
+    draw.ellipse((8, 8, size - 8, size - 8), fill=(200, 30, 30, 255))
+    im.save(path)
+
+
+@pytest.mark.parametrize("executor", ["process", "thread"])
+def test_batch_executors(tmp_path, executor):
+    src = tmp_path / "src"
+    src.mkdir()
+    names = [f"logo{i}" for i in range(5)]
+    for name in names:
+        _write_logo(src / f"{name}.png")
+
+    out = tmp_path / "out"
+    result = CliRunner().invoke(
+        app,
+        ["batch", str(src), str(out), "--jobs", "2", "--executor", executor,
+         "--chunksize", "2", "--quiet"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert result.output.count("OK ") == len(names)
+    for name in names:
+        assert (out / f"{name}.svg").read_text().startswith("<svg")
+
+
+def test_batch_rejects_unknown_executor(tmp_path):
+    result = CliRunner().invoke(app, ["batch", str(tmp_path), str(tmp_path / "out"),
+                                      "--executor", "cluster"])
+    assert result.exit_code != 0
+
+
+def test_batch_progress_walks_subdirectories(tmp_path):
+    src = tmp_path / "src"
+    (src / "nested").mkdir(parents=True)
+    _write_logo(src / "top.png")
+    _write_logo(src / "nested" / "deep.png")
+    (src / "notes.txt").write_text("not an image")
+
+    out = tmp_path / "out"
+    result = CliRunner().invoke(app, ["batch", str(src), str(out)])
+
+    assert result.exit_code == 0, result.output
+    assert (out / "top.svg").exists()
+    assert (out / "deep.svg").exists()
+
+
+def test_batch_manifest_skips_unchanged(tmp_path):
+    import os
+
+    src = tmp_path / "src"
+    src.mkdir()
+    for name in ("a", "b", "c"):
+        _write_logo(src / f"{name}.png")
+    out = tmp_path / "out"
+
+    def run(*extra):
+        result = CliRunner().invoke(app, ["batch", str(src), str(out), "--quiet", *extra])
+        assert result.exit_code == 0, result.output
+        return result.output
+
+    assert run().count("OK ") == 3
+
+    second = run()
+    assert "OK " not in second
+    assert "Skipped 3" in second
+
+    # Touched but identical content is still up to date.
+    os.utime(src / "a.png", ns=(1, 1))
+    assert "OK " not in run()
+
+    _write_logo(src / "b.png", size=64)
+    third = run()
+    assert third.count("OK ") == 1 and "OK b.png" in third
+
+    cfg = tmp_path / "cfg.json"
+    cfg.write_text('{"rdp_epsilon": 2.0}')
+    assert run("--cfg", str(cfg)).count("OK ") == 3
+    assert run("--cfg", str(cfg), "--force").count("OK ") == 3
@@ -0,0 +1,49 @@
+import numpy as np
+
+from bitmap2svg.bwtrace_cv2 import trace_bitmap
+from bitmap2svg.geometry import BezierPath, Circle, Contours, primitive
+from bitmap2svg.simplify import rdp_all
+
+
+def test_pack_index_and_take():
+    polys = [[(0, 0), (1, 0), (1, 1)], [], [(5, 5), (6, 6)]]
+    c = Contours.pack(polys)
+    assert len(c) == 3 and c.coords.dtype == np.float64
+    assert c.lengths.tolist() == [3, 0, 2]
+    assert c[2].tolist() == [[5, 5], [6, 6]]
+    assert [len(p) for p in c] == [3, 0, 2]
+    t = c.take([2, 0])
+    assert t.tolist() == [[(5.0, 5.0), (6.0, 6.0)], [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)]]
+    assert c.take(c.lengths > 0).lengths.tolist() == [3, 2]
+    both = Contours.concat([c, t])
+    assert both.tolist() == c.tolist() + t.tolist()
+
+
+def test_closed_appends_start_point_once():
+    c = Contours.pack([[(0, 0), (2, 0), (2, 2)], [(0, 0), (1, 0), (0, 0)], [(3, 3), (4, 4)]])
+    closed = c.closed()
+    assert closed.lengths.tolist() == [4, 3, 2]
+    assert closed[0].tolist() == [[0, 0], [2, 0], [2, 2], [0, 0]]
+    assert closed[2].tolist() == [[3, 3], [4, 4]]
+
+
+def test_trace_and_simplify_stay_packed():
+    bw = np.zeros((40, 40), dtype=np.uint8)
+    bw[5:15, 5:15] = 255
+    bw[20:35, 22:30] = 255
+    traced = trace_bitmap(bw)
+    assert isinstance(traced, Contours) and len(traced) == 2
+    for ring in traced:
+        assert (ring[0] == ring[-1]).all()
+    simple = rdp_all(traced, epsilon=1.0)
+    assert isinstance(simple, Contours)
+    assert simple.lengths.tolist() == [5, 5]
+
+
+def test_primitive_converts_legacy_tuples():
+    circ = primitive(("circle", (1.0, 2.0, 3.0)))
+    assert isinstance(circ, Circle) and (circ.cx, circ.r) == (1.0, 3.0)
+    bez = primitive(("bezier", [[(0, 0), (1, 1), (2, 1), (3, 0)]]))
+    assert isinstance(bez, BezierPath) and bez.ctrl.shape == (1, 4, 2)
+    assert primitive(bez) is bez
+    assert not hasattr(circ, "__dict__")
@@ -0,0 +1,46 @@
+import numpy as np
+from PIL import Image
+
+from bitmap2svg.ingest import load
+
+
+def _png(tmp_path):
+    arr = np.zeros((20, 30, 3), dtype=np.uint8)
+    arr[5:15, 10:20] = (200, 40, 40)
+    path = tmp_path / "logo.png"
+    Image.fromarray(arr).save(path)
+    return path
+
+
+def test_bytes_and_memoryview_decode_like_files(tmp_path):
+    path = _png(tmp_path)
+    data = path.read_bytes()
+    img = load(path)
+    assert img.size == (30, 20) and img.rgba.shape == (20, 30, 4)
+    assert (img.rgba[:, :, 3] == 255).all()
+    for src in (data, bytearray(data), memoryview(data)):
+        np.testing.assert_array_equal(load(src).rgba, img.rgba)
+
+
+def test_derived_planes_are_lazy(tmp_path):
+    img = load(_png(tmp_path))
+    assert img._gray is None and img._edges is None
+    assert not img.rgba.flags.writeable
+    assert img.edges.max() == 1.0 and img._gray is not None
+    assert img.gray is img.gray
+    assert img.pil.size == img.size
+
+
+def test_oversized_images_are_reduced_while_decoding(tmp_path):
+    arr = np.zeros((400, 600, 3), dtype=np.uint8)
+    arr[100:300, 150:450] = (30, 60, 200)
+    for name in ("big.png", "big.jpg"):
+        Image.fromarray(arr).save(tmp_path / name)
+        img = load(tmp_path / name, max_megapixels=0.02)
+        assert img.source_size == (600, 400) and img.size == (150, 100)
+        assert img.scale == (4.0, 4.0) and img.size[0] * img.size[1] <= 20_000
+        assert load(tmp_path / name).size == (600, 400)
+    full = load(tmp_path / "big.png")
+    assert full.reduced(1.0) is full
+    small = full.reduced(0.02)
+    assert small.size == (150, 100) and small.source_size == (600, 400)
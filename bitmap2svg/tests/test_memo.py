@@ -0,0 +1,48 @@
+import threading
+
+import numpy as np
+
+from bitmap2svg.memo import DigestCache, digest
+
+
+def test_digest_tracks_content_shape_and_layout():
+    a = np.zeros((4, 6), dtype=np.uint8)
+    b = a.copy()
+    assert digest(a) == digest(b)
+    b[2, 3] = 255
+    assert digest(a) != digest(b)
+    assert digest(a) != digest(a.reshape(6, 4))
+    assert digest(b.T) == digest(np.ascontiguousarray(b.T))
+
+
+def test_bounded_by_bytes_with_counters():
+    cache = DigestCache(max_bytes=3000)
+    for i in range(4):
+        cache.put(i, np.zeros(1000, dtype=np.uint8))
+    info = cache.cache_info()
+    assert info.entries == 3 and info.evictions == 1
+    assert info.currsize <= 3000
+    assert cache.get(0) is None
+    assert cache.get(3) is not None
+    cache.put("huge", np.zeros(10_000, dtype=np.uint8))
+    assert cache.get("huge") is None
+    info = cache.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+def test_get_or_compute_is_thread_safe():
+    cache = DigestCache(max_bytes=1 << 20)
+    calls = []
+
+    def work():
+        for i in range(200):
+            cache.get_or_compute(i % 10, lambda: calls.append(1) or np.zeros(8))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    info = cache.cache_info()
+    assert info.entries == 10
+    assert info.hits + info.misses == 800
@@ -5,11 +5,13 @@ import base64
 import pytest
 
 from bitmap2svg.ingest import load
-from bitmap2svg.config import Settings
+from bitmap2svg.config import QACfg, Settings
 from bitmap2svg.pipeline import (
+    clear_stage_caches,
+    stage_cache_info,
     vectorise,
     vectorise_batch,
-    _trace_cached,
+    _trace_cache,
 )
 
 
@@ -25,19 +27,72 @@ def sample_image(tmp_path):
 
 def test_caching(sample_image):
     cfg = Settings()
-    _trace_cached.cache_clear()
+    _trace_cache.cache_clear()
     vectorise(sample_image, cfg)
-    first_hits = _trace_cached.cache_info().hits
+    first_hits = _trace_cache.cache_info().hits
     vectorise(sample_image, cfg)
-    second_hits = _trace_cached.cache_info().hits
+    second_hits = _trace_cache.cache_info().hits
     assert second_hits > first_hits
 
 
 def test_vectorise_batch(sample_image):
     cfg = Settings()
-    _trace_cached.cache_clear()
+    _trace_cache.cache_clear()
     images = [sample_image, sample_image]
     results = vectorise_batch(images, cfg)
     assert len(results) == 2
-    assert _trace_cached.cache_info().hits > 0
+    assert _trace_cache.cache_info().hits > 0
 
+
+@pytest.fixture
+def logo_image(tmp_path):
+    from PIL import Image, ImageDraw
+
+    im = Image.new("RGBA", (64, 48), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(im)
+    draw.ellipse((6, 6, 40, 40), fill=(220, 40, 40, 255))
+    draw.polygon([(36, 8), (60, 20), (44, 44)], fill=(30, 60, 200, 255))
+    img_path = tmp_path / "logo.png"
+    im.save(img_path)
+    return load(img_path)
+
+
+def test_downstream_change_reuses_upstream_stages(logo_image):
+    clear_stage_caches()
+    cfg = Settings()
+    first = vectorise(logo_image, cfg)
+    before = stage_cache_info()
+
+    tweaked = cfg.model_copy(update={"bezier": cfg.bezier.model_copy(update={"max_err_px": 0.5})})
+    vectorise(logo_image, tweaked)
+    after = stage_cache_info()
+
+    for name in ("segment", "trace", "simplify", "snap"):
+        assert after[name].misses == before[name].misses, name
+        assert after[name].hits > before[name].hits, name
+    for name in ("fit", "compose"):
+        assert after[name].misses == before[name].misses + 1, name
+    assert after["qa"].misses == 0  # QA runs only when metrics are read
+
+    again = vectorise(logo_image, cfg)
+    assert again.svg_min == first.svg_min
+    assert stage_cache_info()["fit"].hits == after["fit"].hits + 1
+
+
+def test_result_is_lazy_and_qa_mode_is_honoured(logo_image):
+    clear_stage_caches()
+    res = vectorise(logo_image, Settings())
+    assert not hasattr(res, "__dict__")
+    assert stage_cache_info()["qa"].misses == 0
+    assert {"ssim", "edge_iou", "bytes"} <= res.metrics.keys()
+    assert stage_cache_info()["qa"].misses == 1
+    assert res.svg_pretty.startswith("<svg")
+    assert [color for _items, color in res.geometry]
+
+    off = vectorise(logo_image, Settings(qa=QACfg(mode="off")))
+    assert off.metrics == {"bytes": len(off.svg_min.encode("utf-8"))}
+    assert stage_cache_info()["qa"].misses == 1
+    assert "ssim" in off.run_qa()
+
+    every = vectorise(logo_image, Settings(qa=QACfg(mode="sampled", sample_every=1)))
+    assert "ssim" in every.metrics
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from bitmap2svg.config import Settings
+from bitmap2svg.workers.pool import run_batch
+
+
+def _write_logo(path: Path, size: int = 24) -> None:
+    im = Image.new("RGBA", (size, size), (255, 255, 255, 255))
+    ImageDraw.Draw(im).rectangle((4, 4, size - 5, size - 9), fill=(20, 90, 200, 255))
+    im.save(path)
+
+
+def test_run_batch_bounds_inflight(tmp_path):
+    files = []
+    for i in range(8):
+        files.append(tmp_path / f"logo{i}.png")
+        _write_logo(files[-1])
+    out = tmp_path / "out"
+    out.mkdir()
+
+    consumed: list[Path] = []
+
+    def paths():
+        for p in files:
+            consumed.append(p)
+            yield p
+
+    it = run_batch(paths(), out, Settings(), jobs=2, executor="thread",
+                   chunksize=1, max_inflight=3)
+    first = next(it)
+    assert first[0]
+    assert len(consumed) <= 3
+
+    rest = list(it)
+    assert len(rest) == len(files) - 1
+    assert sorted(p.name for p in out.iterdir()) == sorted(f"logo{i}.svg" for i in range(8))
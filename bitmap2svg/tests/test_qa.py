@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from bitmap2svg import qa
+from bitmap2svg.config import QACfg
+
+
+class _Img:
+    def __init__(self, gray):
+        self.gray = gray
+        self.size = (gray.shape[1], gray.shape[0])
+
+
+def _scene():
+    gray = np.full((60, 80), 255, dtype=np.uint8)
+    gray[10:50, 10:40] = 40
+    gray[20:40, 50:70] = 120
+    layers = [
+        ([("rect", (0.0, 0.0, 80.0, 60.0))], (255, 255, 255, 255)),
+        ([("rect", (10.0, 10.0, 30.0, 40.0))], (40, 40, 40, 255)),
+        ([("rect", (50.0, 20.0, 20.0, 20.0))], (120, 120, 120, 255)),
+    ]
+    return _Img(gray), layers
+
+
+def test_ssim_identical_and_local_defect():
+    rng = np.random.default_rng(0)
+    a = rng.integers(0, 256, (64, 64), dtype=np.uint8)
+    assert qa._ssim(a, a) == pytest.approx(1.0, abs=1e-5)
+    flat = np.full((128, 128), 200, dtype=np.uint8)
+    blemish = flat.copy()
+    blemish[60:68, 60:68] = 0
+    # A small blemish barely moves global statistics but is caught by windows.
+    assert qa._ssim(flat, blemish) < 0.999
+    assert qa._ssim(flat, blemish) > 0.9
+
+
+def test_evaluate_matching_render_scores_high_on_all_levels():
+    img, layers = _scene()
+    m = qa.evaluate("<svg/>", img, QACfg(), layers)
+    assert m["qa_scale"] == 4 and len(m["ssim_levels"]) == 3
+    assert min(m["ssim_levels"]) > 0.95
+    assert m["ssim"] == pytest.approx(np.mean(m["ssim_levels"]))
+
+
+def test_early_exit_decides_at_coarse_scale():
+    img, layers = _scene()
+    cfg = QACfg(early_exit_margin=0.05, ssim_thresh=0.5, edge_iou_thresh=0.5)
+    m = qa.evaluate("<svg/>", img, cfg, layers)
+    assert m["qa_scale"] == 1
+    wrong = [layers[0]]
+    m = qa.evaluate("<svg/>", img, cfg, wrong)
+    assert m["qa_scale"] == 1 and m["edge_iou"] < 0.45
+    # Too close to call: falls through to the full-scale pyramid.
+    cfg = QACfg(early_exit_margin=1.0)
+    assert qa.evaluate("<svg/>", img, cfg, layers)["qa_scale"] == 4
+
+
+def test_target_pyramid_is_shared_between_evaluations():
+    img, layers = _scene()
+    qa._target_cache.cache_clear()
+    qa.evaluate("<svg/>", img, QACfg(), layers)
+    qa.evaluate("<svg/>", img, QACfg(), layers[:2])
+    info = qa._target_cache.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from bitmap2svg.raster import flatten_bezier, rasterize
+
+
+def test_rect_covers_its_pixels():
+    out = rasterize([([("rect", (2.0, 3.0, 4.0, 5.0))], (200, 200, 200, 255))], (10, 10))
+    assert out.shape == (10, 10)
+    assert (out[3:8, 2:6] == 200).all()
+    out[3:9, 2:7] = 0  # at most one extra sample on the right/bottom edges
+    assert not out.any()
+
+
+def test_circle_area_and_scale():
+    layers = [([("circle", (20.0, 20.0, 10.0))], (255, 255, 255, 255))]
+    for scale, rel in ((1, 0.1), (4, 0.03)):
+        out = rasterize(layers, (40, 40), scale=scale)
+        assert out.shape == (40 * scale, 40 * scale)
+        area = out.sum() / 255.0 / scale**2
+        assert area == pytest.approx(np.pi * 100, rel=rel)
+
+
+def test_later_layers_draw_on_top_and_alpha_blends():
+    layers = [
+        ([("rect", (0.0, 0.0, 8.0, 8.0))], (255, 255, 255, 255)),
+        ([("poly", [(0.0, 0.0), (4.0, 0.0), (4.0, 8.0), (0.0, 8.0)])], (0, 0, 0, 255)),
+        ([("rect", (4.0, 0.0, 4.0, 4.0))], (0, 0, 0, 128)),
+    ]
+    out = rasterize(layers, (8, 8))
+    assert (out[:, :4] == 0).all()
+    assert (out[5:, 5:] == 255).all()
+    assert abs(int(out[1, 6]) - 127) <= 1
+
+
+def test_flatten_bezier_follows_the_curve():
+    seg = [(0.0, 0.0), (0.0, 10.0), (10.0, 10.0), (10.0, 0.0)]
+    pts = flatten_bezier([seg])
+    assert tuple(pts[0]) == (0.0, 0.0) and tuple(pts[-1]) == (10.0, 0.0)
+    assert pts[:, 1].max() == pytest.approx(7.5, abs=0.05)
+    assert len(flatten_bezier([seg], scale=8)) > len(pts)
+
+
+def test_matches_cairosvg_when_available():
+    try:
+        from cairosvg import svg2png  # noqa: F401
+    except (ImportError, OSError):
+        pytest.skip("cairosvg/libcairo not available")
+    from bitmap2svg.config import SVGCfg
+    from bitmap2svg.qa import _render_svg
+    from bitmap2svg.svg_io import compose
+
+    layers = [
+        ([("rect", (0.0, 0.0, 48.0, 32.0))], (250, 250, 250, 255)),
+        ([("circle", (16.0, 16.0, 9.5))], (200, 30, 30, 255)),
+        ([("poly", [(28.0, 4.0), (44.0, 28.0), (28.0, 28.0)])], (20, 40, 180, 255)),
+    ]
+    svg = compose(layers, (48, 32), SVGCfg()).minified
+    ref = _render_svg(svg, (48, 32), scale=4).astype(int)
+    ours = rasterize(layers, (48, 32), scale=4).astype(int)
+    assert np.abs(ref - ours).mean() < 2.0
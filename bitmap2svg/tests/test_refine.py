@@ -0,0 +1,48 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from PIL import Image
+
+from bitmap2svg.config import Settings
+from bitmap2svg.geometry import Contours
+from bitmap2svg.ingest import load
+from bitmap2svg.pipeline import vectorise
+from bitmap2svg.refine import refine_band
+
+
+def test_points_move_onto_the_full_resolution_edge():
+    full = np.zeros((80, 80, 4), dtype=np.uint8)
+    full[..., 3] = 255
+    full[:, :37, :3] = 200  # the edge sits inside reduced pixel 9
+    colors = np.array([(200, 200, 200), (0, 0, 0)])
+    # A vertical boundary traced at 1/4 scale through the centres of the last light pixels.
+    line = Contours.pack([np.array([[9.0, 0.0], [9.0, 10.0], [9.0, 19.0]])])
+    out = refine_band(line, np.array([0]), full, colors, (4.0, 4.0))
+    # In full pixels: centre of pixel 36, the last light one; the end points stay put.
+    np.testing.assert_allclose(out.coords[1, 0] * 4 + 1.5, 36.0, atol=0.25)
+    np.testing.assert_array_equal(out.coords[[0, 2]], line.coords[[0, 2]])
+    corners = Contours.pack([np.array([[9.0, 0.0], [9.0, 10.0], [9.0, 20.0]])])
+    out = refine_band(corners, np.array([0]), full, colors, (4.0, 4.0), corners=True)
+    np.testing.assert_allclose(out.coords[1, 0] * 4, 37.0, atol=0.25)
+
+
+def test_reduced_vectorisation_keeps_the_original_viewbox(tmp_path):
+    arr = np.full((400, 600, 3), 255, dtype=np.uint8)
+    arr[101:299, 151:449] = (30, 60, 200)
+    Image.fromarray(arr).save(tmp_path / "big.png")
+    img = load(tmp_path / "big.png")
+    for mode in ("layers", "topology"):
+        for refine in (False, True):
+            cfg = Settings(k_colors=2, trace_mode=mode, ingest={"max_megapixels": 0.02, "refine": refine})
+            res = vectorise(img, cfg)
+            assert ET.fromstring(res.svg_min).get("viewBox") == "0 0 600 400"
+            assert res.metrics["ssim"] > 0.9  # QA runs on the reduced copy
+            (shape,), _ = res.geometry[-1]
+            if mode == "layers":
+                # In original pixel centres, as at full resolution: Rect(151, 101, 297, 197).
+                assert shape.kind == "rect"
+                np.testing.assert_allclose([shape.x, shape.y, shape.w, shape.h], [151, 101, 297, 197],
+                                           atol=0.5 if refine else 5.0)
+            else:
+                P = np.concatenate([ring.ctrl[:, 0] for ring in shape.rings])
+                np.testing.assert_allclose([*P.min(axis=0), *P.max(axis=0)], [151, 101, 449, 299], atol=5.0)
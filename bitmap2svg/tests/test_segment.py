@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from bitmap2svg.config import SegmentCfg, Settings
+from bitmap2svg.ingest import LoadedImage
+from bitmap2svg.pipeline import vectorise
+from bitmap2svg.segment import NONE, Layer, _assign, _histogram, _kmeans_palette, label_image, to_layers
+
+
+def _logo():
+    im = Image.new("RGBA", (120, 90), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(im)
+    draw.ellipse((10, 10, 70, 70), fill=(220, 40, 40, 255))
+    draw.polygon([(60, 8), (114, 40), (80, 84)], fill=(30, 60, 200, 255))
+    # Downsampling adds anti-aliasing ramps between the flat colours.
+    return np.asarray(im.resize((60, 45), Image.LANCZOS))
+
+
+def test_histogram_weights_cover_every_pixel():
+    rgb = _logo()[:, :, :3].reshape(-1, 3)
+    colors, weights = _histogram(rgb, 5)
+    assert weights.sum() == len(rgb)
+    exact, exact_w = _histogram(rgb, 8)
+    assert len(exact) == len(np.unique(rgb, axis=0)) and exact_w.sum() == len(rgb)
+    assert len(colors) <= len(exact)
+
+
+def test_histogram_palette_finds_flat_colours_deterministically():
+    rgba = _logo()
+    palette = _kmeans_palette(rgba, 3)
+    assert (palette == _kmeans_palette(rgba, 3)).all()
+    assert (palette[:, 3] == 255).all()
+    want = np.array([(255, 255, 255), (220, 40, 40), (30, 60, 200)])
+    d = np.abs(palette[:, None, :3].astype(int) - want[None]).sum(axis=2)
+    assert (d.min(axis=0) <= 16).all()
+
+
+def test_photo_fallback_is_seeded():
+    rng = np.random.default_rng(1)
+    rgba = np.dstack([rng.integers(0, 256, (80, 80, 3)), np.full((80, 80), 255)]).astype(np.uint8)
+    cfg = SegmentCfg(max_colors=16, sample_pixels=2000)
+    a = _kmeans_palette(rgba, 4, cfg)
+    assert len(a) == 4 and (a == _kmeans_palette(rgba, 4, cfg)).all()
+    assert not (a == _kmeans_palette(rgba, 4, cfg.model_copy(update={"seed": 7}))).all()
+
+
+def test_block_assignment_matches_full_argmin(monkeypatch):
+    rgba = _logo().copy()
+    rgba[:3, :3, 3] = 0
+    palette = _kmeans_palette(rgba, 3)
+    monkeypatch.setattr("bitmap2svg.segment._BLOCK_PIXELS", 100)  # several row blocks
+    labels = _assign(rgba, palette)
+    d = ((rgba[:, :, None, :3].astype(int) - palette[None, None, :, :3].astype(int))**2).sum(axis=3)
+    want = np.where(rgba[:, :, 3] > 10, d.argmin(axis=2), NONE)
+    assert labels.dtype == np.uint8 and (labels == want).all()
+
+
+def test_layers_share_one_despeckled_label_image():
+    arr = np.full((40, 50, 4), 255, dtype=np.uint8)
+    arr[10:30, 20:40, :3] = (200, 30, 30)
+    arr[5, 5, :3] = (200, 30, 30)       # a lone speckle
+    arr[34:36, 5:7, :3] = (200, 30, 30)  # a 2x2 dot survives
+    img = SimpleNamespace(rgba=arr)
+    layers = to_layers(img, Settings(k_colors=2))
+    assert len(layers) == 2 and layers[0].labels is layers[1].labels
+    red = layers[1]
+    assert red.area == 20*20 + 4 and red.bbox == (5, 10, 40, 36)
+    x0, y0, x1, y1 = red.bbox
+    np.testing.assert_array_equal(red.mask[y0:y1, x0:x1], red.crop())
+    assert red.mask.sum() == red.crop().sum() and red.mask[5, 5] == 0
+    np.testing.assert_array_equal(label_image(img, layers), (red.mask > 0).astype(np.int32))
+
+
+def test_single_pixel_layers():
+    layer = Layer.from_mask(np.array([[0, 0], [0, 1]], dtype=np.uint8), (0, 0, 0, 255))
+    assert layer.bbox == (1, 1, 2, 2) and layer.crop().tolist() == [[255]]
+    assert layer.crop().dtype == np.uint8
+    rgba = np.full((1, 1, 4), 255, dtype=np.uint8)
+    img = LoadedImage(rgba=rgba, size=(1, 1))
+    for mode in ("layers", "topology"):
+        res = vectorise(img, Settings(trace_mode=mode, qa={"mode": "off"}))
+        assert 'viewBox="0 0 1 1"' in res.svg_min
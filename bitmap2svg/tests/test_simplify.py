@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from _reference import ref_rdp
+from bitmap2svg.bench import noisy_circle
+from bitmap2svg.geometry import Contours
+from bitmap2svg.simplify import rdp_all, rdp_mask
+
+
+def _cases():
+    rings = [noisy_circle(n, noise=nz, seed=n) for n in (4, 50, 2000) for nz in (0.3, 2.0)]
+    rings += [np.round(r) for r in rings]  # integer coordinates produce ties
+    rings += [np.array([[0, 0], [1, 1], [2, 2], [3, 3.0]]), np.zeros((4, 2)),
+              np.array([[1.0, 1.0]]), np.zeros((0, 2))]
+    return rings
+
+
+@pytest.mark.parametrize("eps", [0.0, 0.5, 1.2, 3.0])
+def test_batched_rdp_matches_reference(eps):
+    rings = _cases()
+    packed = Contours.pack(rings)
+    keep = rdp_mask(packed.coords, packed.offsets, eps)
+    for i, ring in enumerate(rings):
+        a, b = packed.offsets[i], packed.offsets[i + 1]
+        np.testing.assert_array_equal(packed.coords[a:b][keep[a:b]], ref_rdp(ring, eps))
+
+
+def test_matches_rdp_package_when_installed():
+    rdp = pytest.importorskip("rdp").rdp
+    for ring in _cases()[:12]:
+        np.testing.assert_array_equal(rdp_all([ring], 1.2)[0], rdp(ring, epsilon=1.2))
+
+
+def test_rdp_all_keeps_rings_closed():
+    open_ring = np.array([[0, 0], [10, 0], [10, 10], [5, 10.3], [0, 10]], dtype=float)
+    out = rdp_all([open_ring, noisy_circle(500)], epsilon=1.0)
+    assert len(out) == 2
+    for ring in out:
+        assert (ring[0] == ring[-1]).all()
+    assert out[0].tolist() == [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]
@@ -0,0 +1,59 @@
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from bitmap2svg.config import Settings
+from bitmap2svg.workers.manifest import settings_hash
+from bitmap2svg.workers.store import ResultStore, cached_vectorise
+
+
+def _png_bytes(size: int = 32) -> bytes:
+    im = Image.new("RGBA", (size, size), (255, 255, 255, 255))
+    ImageDraw.Draw(im).ellipse((4, 4, size - 4, size - 4), fill=(10, 120, 60, 255))
+    buf = BytesIO()
+    im.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_key_depends_on_content_and_settings():
+    a, b = _png_bytes(32), _png_bytes(40)
+    cfg = Settings()
+    assert ResultStore.key(a, cfg) == ResultStore.key(a, Settings())
+    assert ResultStore.key(a, cfg) != ResultStore.key(b, cfg)
+    assert ResultStore.key(a, cfg) != ResultStore.key(a, Settings(rdp_epsilon=2.0))
+
+
+def test_key_depends_on_pipeline_version(monkeypatch):
+    data, cfg = _png_bytes(), Settings()
+    before = settings_hash(cfg), ResultStore.key(data, cfg)
+    monkeypatch.setattr("bitmap2svg.workers.manifest.PIPELINE_VERSION", 2)
+    assert settings_hash(cfg) != before[0]
+    assert ResultStore.key(data, cfg) != before[1]
+
+
+def test_results_are_shared_between_handles(tmp_path):
+    data, cfg = _png_bytes(), Settings()
+    first = cached_vectorise(data, cfg, ResultStore(tmp_path))
+    other = ResultStore(tmp_path)
+    hit = other.get(ResultStore.key(data, cfg))
+    assert hit is not None
+    assert hit.svg_min == first.svg_min
+    assert hit.metrics == first.metrics
+    again = cached_vectorise(data, cfg, other)
+    assert again.svg_min == first.svg_min and again.metrics == first.metrics
+    assert again.svg_pretty == first.svg_pretty != again.svg_min
+    assert len(again.geometry) == len(first.geometry)
+    assert "ssim" in again.run_qa() and again.metrics["ssim"] == first.run_qa()["ssim"]
+
+
+def test_lru_eviction_by_size(tmp_path):
+    store = ResultStore(tmp_path, max_bytes=250)
+    for key in ("a", "b", "c"):
+        store.put(key, "x" * 100, {"bytes": 100})
+    assert store.get("a") is None
+    assert store.get("b") is not None
+    store.put("d", "x" * 100, {"bytes": 100})
+    assert store.get("c") is None
+    assert store.get("b") is not None
+    assert store.total_bytes() <= 250
+    assert not (tmp_path / "blobs" / "c"[:2] / "c.svg").exists()
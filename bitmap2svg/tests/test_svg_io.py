@@ -0,0 +1,73 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from PIL import Image
+
+from bitmap2svg.config import Settings, SVGCfg
+from bitmap2svg.ingest import load
+from bitmap2svg.pipeline import vectorise
+from bitmap2svg.svg_io import _short, compose, to_string, write_svg
+
+LAYERS = [
+    ([("rect", (0.0, 0.0, 8.0, 8.0)), ("circle", (1.23456, 2.0, 3.0))], (255, 0, 0, 255)),
+    ([("poly", [(0.0, 0.0), (1.5, 0.0), (1.0, 2.0)]),
+      ("bezier", [[(0, 0), (1, 1), (2, 2), (3, 0)], [(3, 0), (2, -1), (1, -1), (0, 0)]])],
+     (0, 0, 255, 128)),
+]
+NS = "{http://www.w3.org/2000/svg}"
+
+
+def test_elements_and_path_data():
+    root = ET.fromstring(to_string(LAYERS, (10, 10), SVGCfg()))
+    assert root.get("viewBox") == "0 0 10 10"
+    rect, circle, poly, bez = root.find(f"{NS}g")
+    assert rect.get("width") == "8.0" and rect.get("fill") == "rgba(255,0,0,1.000)"
+    assert circle.get("cx") == "1.235"
+    assert poly.get("d") == "M 0.000 0.000 L 1.500 0.000 L 1.000 2.000 Z"
+    assert bez.get("d") == ("M 0.000 0.000 C 1.000 1.000 2.000 2.000 3.000 0.000 "
+                            "C 2.000 -1.000 1.000 -1.000 0.000 0.000 Z")
+    assert bez.get("fill") == "rgba(0,0,255,0.502)"
+
+
+def test_pretty_and_minified_are_the_same_document():
+    out = compose(LAYERS, (10, 10), SVGCfg(decimals=1))
+    assert "\n" not in out.minified and out.pretty.count("\n") == 8
+    assert "".join(line.strip() for line in out.pretty.splitlines()) == out.minified
+    assert "M 0.0 0.0 L 1.5 0.0" in out.minified
+
+
+def test_write_svg_streams_to_a_file(tmp_path):
+    path = tmp_path / "out.svg"
+    with open(path, "w", encoding="utf-8") as f:
+        n = write_svg(LAYERS, (10, 10), SVGCfg(), f, pretty=True)
+    text = path.read_text(encoding="utf-8")
+    assert n == len(text)
+    assert text == to_string(LAYERS, (10, 10), SVGCfg(), pretty=True)
+
+
+def test_short_numbers():
+    assert _short([1.5, -0.5, 0.0, -0.0001, 2.0, 0.25, 0.5, 100, -3.25], 3) == \
+        "1.5-.5 0 0 2 .25.5 100-3.25"
+    assert _short([100, -0.2, 3.0], 0) == "100 0 3"
+
+
+def test_compact_merges_each_colour_into_one_relative_path():
+    root = ET.fromstring(to_string(LAYERS, (10, 10), SVGCfg(encoding="compact")))
+    red, blue = root.find(f"{NS}g")
+    assert red.get("fill") == "#f00" and red.get("fill-opacity") is None
+    assert red.get("d") == "m0 0h8v8h-8zm-1.765 2a3 3 0 1 1 6 0 3 3 0 1 1-6 0z"
+    assert blue.get("fill") == "#00f" and blue.get("fill-opacity") == ".502"
+    # Both subpaths are turned clockwise so nonzero filling paints their union.
+    assert blue.get("d") == "m0 0l1.5 0-.5 2zm0 0c1-1 2-1 3 0-1 2-2 1-3 0z"
+
+
+def test_compact_reports_bytes_saved(tmp_path):
+    arr = np.full((40, 60, 3), 255, dtype=np.uint8)
+    arr[5:35, 5:30] = (200, 30, 30)
+    arr[10:30, 38:55] = (30, 30, 200)
+    Image.fromarray(arr).save(tmp_path / "logo.png")
+    img = load(tmp_path / "logo.png")
+    plain = vectorise(img, Settings(qa={"mode": "off"}))
+    compact = vectorise(img, Settings(qa={"mode": "off"}, svg={"encoding": "compact"}))
+    assert "bytes_saved" not in plain.metrics
+    assert compact.metrics["bytes_saved"] == plain.metrics["bytes"] - compact.metrics["bytes"] > 0
@@ -0,0 +1,68 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from PIL import Image
+
+from bitmap2svg.config import Settings
+from bitmap2svg.ingest import load
+from bitmap2svg.pipeline import vectorise
+from bitmap2svg.raster import rasterize
+from bitmap2svg.topology import assemble, crack_chains
+
+NS = "{http://www.w3.org/2000/svg}"
+
+
+def _lines(chain):
+    a, b = chain[:-1], chain[1:]
+    return np.stack([a, a + (b - a)/3, a + 2*(b - a)/3, b], axis=1)
+
+
+def _coverage(compound, shape):
+    out = rasterize([([compound], (255, 255, 255, 255))], (shape[1], shape[0]), scale=4)
+    # Look at the inner 2x2 samples of every pixel.
+    return out.reshape(shape[0], 4, shape[1], 4)[:, 1:3, :, 1:3].min(axis=(1, 3)) > 0
+
+
+def test_regions_are_rebuilt_exactly_from_shared_chains():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        labels = np.kron(rng.integers(-1, 3, (5, 6)), np.ones((2, 2), dtype=int))
+        net = crack_chains(labels)
+        compounds = assemble(net, [_lines(c) for c in net.chains], 3)
+        for r, comp in enumerate(compounds):
+            if comp is None:
+                assert not (labels == r).any()
+                continue
+            assert (_coverage(comp, labels.shape) == (labels == r)).all()
+            # Rings run clockwise around the region: signed area is its pixel count.
+            area = 0.0
+            for ring in comp.rings:
+                x, y = ring.ctrl[:, 0, 0], ring.ctrl[:, 0, 1]
+                area += 0.5 * (x @ np.roll(y, -1) - np.roll(x, -1) @ y)
+            assert area == (labels == r).sum()
+
+
+def test_hole_and_shared_edge_are_single_chains():
+    labels = np.zeros((8, 8), dtype=int)
+    labels[2:6, 2:6] = 1
+    labels[3:5, 3:5] = -1
+    net = crack_chains(labels)
+    assert len(net) == 3 and net.cycle.all()
+    sides = sorted(zip(net.lo.tolist(), net.hi.tolist()))
+    assert sides == [(-1, 0), (-1, 1), (0, 1)]
+    comps = assemble(net, [_lines(c) for c in net.chains], 2)
+    assert len(comps[0].rings) == 2 and len(comps[1].rings) == 2
+
+
+def test_topology_mode_emits_one_evenodd_path_per_layer(tmp_path):
+    arr = np.full((40, 60, 3), 255, dtype=np.uint8)
+    arr[5:35, 5:30] = (200, 30, 30)
+    arr[12:28, 12:22] = (255, 255, 255)  # a counter inside the red shape
+    arr[10:30, 30:55] = (30, 30, 200)    # touches the red shape
+    Image.fromarray(arr).save(tmp_path / "logo.png")
+    img = load(tmp_path / "logo.png")
+    res = vectorise(img, Settings(k_colors=3, trace_mode="topology"))
+    assert [[p.kind for p in items] for items, _ in res.geometry] == [["compound"]] * 3
+    paths = ET.fromstring(res.svg_min).find(f"{NS}g")
+    assert len(paths) == 3 and all(p.get("fill-rule") == "evenodd" for p in paths)
+    assert res.metrics["ssim"] > 0.9
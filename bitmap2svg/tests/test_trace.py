@@ -0,0 +1,106 @@
+import numpy as np
+from PIL import Image
+
+from bitmap2svg.bwtrace_cv2 import trace_bitmap, trace_regions
+from bitmap2svg.config import Settings
+from bitmap2svg.geometry import Circle, Contours, Rect, as_ring
+from bitmap2svg.ingest import load
+from bitmap2svg.pipeline import _drop_short, _group_holes, vectorise
+from bitmap2svg.raster import rasterize
+from bitmap2svg.segment import Layer, mask_to_bw
+from bitmap2svg.vector_critic import SnapCfg, snap
+
+
+def _ring_mask():
+    bw = np.zeros((30, 30), dtype=np.uint8)
+    bw[5:25, 5:25] = 255
+    bw[10:20, 10:20] = 0
+    bw[13:17, 13:17] = 255  # an island inside the hole
+    return bw
+
+
+def test_trace_regions_links_holes_to_outlines():
+    contours, parent = trace_regions(_ring_mask())
+    assert len(contours) == 3
+    outlines = np.flatnonzero(parent < 0)
+    assert len(outlines) == 2
+    (hole,) = np.flatnonzero(parent >= 0)
+    assert contours[parent[hole]][:, 0].min() == 5  # the hole belongs to the big square
+    assert len(trace_bitmap(_ring_mask())) == 1  # outer outlines only
+
+
+def test_as_ring_orientation():
+    for prim in (Circle(5.0, 5.0, 2.0), Rect(1.0, 1.0, 3.0, 2.0)):
+        for clockwise in (True, False):
+            ring = as_ring(prim, clockwise)
+            P = ring.points if ring.kind == "poly" else ring.ctrl[:, 0]
+            area2 = P[:, 0] @ np.roll(P[:, 1], -1) - np.roll(P[:, 0], -1) @ P[:, 1]
+            assert (area2 > 0) == clockwise
+
+
+def test_only_holes_over_lower_layers_are_kept():
+    bw = _ring_mask()
+    layer = Layer.from_mask(bw, (0, 0, 0, 255))
+    assert layer.bbox == (5, 5, 25, 25)
+    nothing_below = np.zeros((20, 20), dtype=bool)
+    assert (mask_to_bw(None, layer, nothing_below) == 255).all()
+    below = np.zeros((20, 20), dtype=bool)
+    below[6, 6] = True
+    np.testing.assert_array_equal(mask_to_bw(None, layer, below), bw[5:25, 5:25])
+
+
+def test_cropped_trace_is_in_canvas_coordinates():
+    canvas = np.zeros((400, 400), dtype=np.uint8)
+    canvas[300:330, 250:280] = _ring_mask()
+    layer = Layer.from_mask(canvas, (0, 0, 0, 255))
+    x0, y0, x1, y1 = layer.bbox
+    crop, parent = trace_regions(mask_to_bw(None, layer), offset=(x0, y0))
+    full, full_parent = trace_regions(canvas)
+    np.testing.assert_array_equal(crop.coords, full.coords)
+    np.testing.assert_array_equal(parent, full_parent)
+
+
+def test_counters_show_the_background(tmp_path):
+    arr = np.full((40, 40, 3), 255, dtype=np.uint8)
+    arr[8:32, 8:32] = (20, 20, 160)
+    arr[15:25, 15:25] = (255, 255, 255)  # the counter of an "o"
+    Image.fromarray(arr).save(tmp_path / "o.png")
+    img = load(tmp_path / "o.png")
+    for holes, counter in ((False, 0), (True, 255)):
+        res = vectorise(img, Settings(k_colors=2, holes=holes, qa={"mode": "off"}))
+        kinds = [p.kind for p in res.geometry[-1][0]]
+        assert ("compound" in kinds) == holes
+        out = rasterize(res.geometry, img.size)
+        assert (out[18:22, 18:22] > 200).all() == bool(counter)
+
+
+def test_padding_does_not_change_the_drawing(tmp_path):
+    arr = np.full((40, 40, 4), 255, dtype=np.uint8)
+    arr[8:32, 8:32, :3] = (20, 20, 160)
+    arr[15:25, 15:25, :3] = 255
+    padded = np.zeros((300, 260, 4), dtype=np.uint8)
+    padded[200:240, 120:160] = arr
+    Image.fromarray(arr).save(tmp_path / "o.png")
+    Image.fromarray(padded).save(tmp_path / "padded.png")
+    for mode in ("layers", "topology"):
+        cfg = Settings(k_colors=2, trace_mode=mode, qa={"mode": "off"})
+        small = load(tmp_path / "o.png")
+        big = load(tmp_path / "padded.png")
+        want = rasterize(vectorise(small, cfg).geometry, small.size)
+        got = rasterize(vectorise(big, cfg).geometry, big.size)
+        np.testing.assert_array_equal(got[200:240, 120:160], want)
+
+
+def test_holes_of_dropped_outlines_are_dropped():
+    # A thin outline simplified down to 3 points, with a 4-point hole.
+    polys = Contours.pack([[(0, 0), (40, 2), (0, 0)],
+                           [(10, 1), (12, 1), (12, 1.5), (10, 1)]])
+    parent = np.array([-1, 0])
+    kept, kept_parent = _drop_short(polys.lengths, parent)
+    assert len(kept) == 0 and len(kept_parent) == 0
+    assert _group_holes(snap(polys.take(kept), SnapCfg()), kept_parent) == []
+
+    # Outlines keep their holes, renumbered among the kept contours.
+    lengths, parent = np.array([3, 5, 4, 4]), np.array([-1, -1, 1, 0])
+    kept, kept_parent = _drop_short(lengths, parent)
+    assert kept.tolist() == [1, 2] and kept_parent.tolist() == [-1, 0]
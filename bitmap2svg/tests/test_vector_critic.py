@@ -1,6 +1,5 @@
 from __future__ import annotations
 import numpy as np
-import pytest
 from bitmap2svg.vector_critic import snap, SnapCfg
 
 def test_snap_circle():
@@ -8,21 +7,21 @@ def test_snap_circle():
     cfg = SnapCfg(circle_tol=1.5)
     result = snap([points], cfg)
     assert len(result) == 1
-    assert result[0][0] == "circle"
+    assert result[0].kind == "circle"
 
 def test_snap_rectangle():
     points = [(0, 0), (0, 2), (2, 2), (2, 0)]
     cfg = SnapCfg(rect_iou=0.95)
     result = snap([points], cfg)
     assert len(result) == 1
-    assert result[0][0] == "rect"
+    assert result[0].kind == "rect"
 
 def test_snap_polygon():
     points = [(0, 0), (1, 1), (1, 0), (0, 1)]
     cfg = SnapCfg(circle_tol=1.5)
     result = snap([points], cfg)
     assert len(result) == 1
-    assert result[0][0] == "poly"
+    assert result[0].kind == "poly"
 
 def test_snap_empty():
     points = []
@@ -34,4 +33,33 @@ def test_snap_invalid():
     points = [(0, 0), (0, 0)]
     cfg = SnapCfg(circle_tol=1.5)
     result = snap([points], cfg)
-    assert len(result) == 0
\ No newline at end of file
+    assert len(result) == 0
+
+
+def test_snap_batch_matches_per_contour_reference():
+    from _reference import ref_snap
+    from bitmap2svg.bench import glyph_contours
+    rng = np.random.default_rng(0)
+    rings = glyph_contours(300)
+    for _ in range(300):
+        w, h = rng.uniform(2, 20, 2)
+        P = np.array([(0, 0), (w, 0), (w, h), (0, h)]) + rng.normal(0, 1.0, (4, 2))
+        P = np.insert(P, rng.integers(0, 4), rng.normal(0, 3, 2) + (w, h), axis=0)
+        rings.append(np.vstack([P, P[:1]]))
+    ref = ref_snap(rings)
+    got = snap(rings, SnapCfg())
+    assert [k for k, _ in ref] == [p.kind for p in got]
+    for (kind, payload), prim in zip(ref, got):
+        if kind == "circle":
+            assert np.allclose(payload, (prim.cx, prim.cy, prim.r))
+        elif kind == "rect":
+            assert np.allclose(payload, (prim.x, prim.y, prim.w, prim.h))
+
+
+def test_snap_self_intersecting_ring_uses_repaired_polygon():
+    # A square whose outline runs back over a spike: the shoelace area and the
+    # point bbox both see the spike, the buffer(0) repair drops it.
+    points = [(0, -5), (0, 0), (19, 1), (19, 19), (0, 19), (0, -5)]
+    result = snap([points], SnapCfg())
+    assert result[0].kind == "rect"
+    assert (result[0].y, result[0].h) == (0.0, 19.0)